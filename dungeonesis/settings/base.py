@@ -40,16 +40,22 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "exptracker.middleware.QueryStatsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "exptracker.middleware.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 AUTH_USER_MODEL = "exptracker.User"
 
+# Sessions can be read from the cache and only fall back to the database on a
+# miss, but only when the cache is shared between workers. See `SHARED_CACHE`
+# below.
+SESSION_ENGINE = "django.contrib.sessions.backends.db"
+
 AUTHENTICATION_BACKENDS = (
     "social_core.backends.google.GoogleOAuth2",
     # In any normal case you should never disallow registering without social
@@ -95,6 +101,30 @@ DATABASES = {
 }
 
 
+# Caching
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+#
+# Per-user data is cached under keys containing the user's data version, see
+# exptracker/caching.py, which works with any backend. Sessions and logged in
+# users can also be cached, but entries can only be deleted from the cache of the
+# worker handling the request. With a per-process cache such as the local memory
+# cache, other workers would keep accepting sessions after logging out and keep
+# serving stale balances. Only set `SHARED_CACHE` when every worker uses the same
+# cache, for instance memcached:
+#
+#     CACHES = {
+#         "default": {
+#             "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+#             "LOCATION": "127.0.0.1:11211",
+#         }
+#     }
+#     SHARED_CACHE = True
+#     SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+SHARED_CACHE = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -138,7 +168,17 @@ STATIC_ROOT = os.path.join(BASE_DIR, "public", "static")
 # https://www.django-rest-framework.org/
 
 REST_FRAMEWORK = {
-    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"]
+    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    # These use orjson when it's installed, see `exptracker.renderers.py`
+    "DEFAULT_RENDERER_CLASSES": [
+        "exptracker.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "exptracker.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
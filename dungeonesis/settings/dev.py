@@ -7,6 +7,11 @@ DEBUG = True
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "j%8-3s^_r7va1w8x1d_u=+f&tfgx($8@6_&m9!qqlsl@b+c&ty"
 
+# The development server runs in a single process, so its local memory cache is
+# shared by every request
+SHARED_CACHE = True
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 # Don't forget to set these in local.py
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = None
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = None
@@ -9,6 +9,9 @@ STATICFILES_STORAGE = "django.contrib.staticfiles.storage.ManifestStaticFilesSto
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = None
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = None
 
+# Sessions and logged in users are only cached after configuring a shared cache
+# backend in local.py, see the caching section in base.py
+
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/ for an
 # overview of settings to set in local.py
 
@@ -0,0 +1,129 @@
+"""
+Aggregated activity statistics for a user's dashboard.
+
+Everything is computed from a single query that sums the log's star amounts
+per day, type and character in the database using the typed `amount` column.
+The resulting rows are then rolled up into weeks and months. Results are cached
+per user, see `exptracker.caching`, so they're automatically invalidated
+whenever a write path adds a new log entry.
+
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from .caching import cached_for_user
+from .models import LogType
+from .utils import stars_to_level
+
+
+def _week(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _month(day):
+    return day.replace(day=1)
+
+
+def _daily_totals(user):
+    """
+    Sum the star amounts in a user's log per day, log type and character. For
+    `CHARACTER_ADDED` entries this is the character's initial number of stars.
+
+    """
+
+    return (
+        user.logs.filter(
+            type__in=[LogType.CHARACTER_ADDED, LogType.STARS_ADDED, LogType.STARS_SPENT]
+        )
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "type", "character", "direct")
+        .annotate(total=Sum("amount"))
+        .order_by("day", "type")
+    )
+
+
+def compute_activity(user):
+    """
+    Compute a user's activity statistics.
+
+    Returns
+    -------
+    dict
+        A dictionary containing:
+
+        - `stars_earned`, the number of stars earned per `week` and `month`.
+          This includes stars added to the pool and stars added directly to a
+          character.
+        - `stars_spent`, the number of stars spent from the pool per
+          character. Characters that have been deleted are not included.
+        - `levels_gained`, the number of levels gained by all characters
+          combined per `week` and `month`.
+
+        Weeks and months are identified by their first day.
+
+    """
+
+    earned = {"week": defaultdict(int), "month": defaultdict(int)}
+    levels = {"week": defaultdict(int), "month": defaultdict(int)}
+    spent = defaultdict(int)
+    character_stars = defaultdict(int)
+
+    # Sorting on the type makes sure characters are added before their first
+    # star spend on the same day
+    for row in _daily_totals(user):
+        log_type = row["type"]
+        character = row["character"]
+        amount = row["total"] or 0
+        periods = {"week": _week(row["day"]), "month": _month(row["day"])}
+
+        if log_type == str(LogType.STARS_ADDED) or row["direct"]:
+            for period, start in periods.items():
+                earned[period][start] += amount
+        elif log_type == str(LogType.STARS_SPENT) and character is not None:
+            spent[character] += amount
+
+        if character is None:
+            continue
+
+        if log_type == str(LogType.CHARACTER_ADDED):
+            # A character's starting level doesn't count as gained levels
+            character_stars[character] = amount
+        elif log_type == str(LogType.STARS_SPENT):
+            old_level = stars_to_level(max(character_stars[character], 0))[0]
+            character_stars[character] += amount
+            new_level = stars_to_level(max(character_stars[character], 0))[0]
+
+            for period, start in periods.items():
+                levels[period][start] += new_level - old_level
+
+    def serialize(totals):
+        return [
+            {"start": start, "total": total} for start, total in sorted(totals.items())
+        ]
+
+    return {
+        "stars_earned": {
+            period: serialize(totals) for period, totals in earned.items()
+        },
+        "stars_spent": [
+            {"character": character, "total": total}
+            for character, total in sorted(spent.items())
+        ],
+        "levels_gained": {
+            period: serialize(totals) for period, totals in levels.items()
+        },
+    }
+
+
+def get_activity(user):
+    """
+    Return a user's activity statistics from the cache, computing them if
+    needed. See `compute_activity()`.
+
+    """
+
+    return cached_for_user(user, "activity", lambda: compute_activity(user))
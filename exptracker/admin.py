@@ -1,6 +1,141 @@
+import json
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import Character, LogEntry, User
+
+# Result counts below this estimate are still counted exactly
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that uses PostgreSQL's query planner to estimate the number of
+    results instead of running a `COUNT(*)` query, which has to scan the entire
+    table or index. Small result sets are still counted exactly. Other
+    databases always use an exact count.
+
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return super().count
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        estimate = plan[0]["Plan"]["Plan Rows"]
+        if estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Shared options for the admin pages of tables that can grow to millions of
+    rows. These avoid counting the entire table on every page load.
+
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class UserDataAdmin(LargeTableAdmin):
+    """
+    Options for the admin pages of models that belong to a user. Saving or
+    deleting objects marks the owners' data as modified, so their cached data
+    and ETags get invalidated, see `User.bump_data_version()`.
+
+    """
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.bump_data_versions({obj.user_id})
+
+    def delete_model(self, request, obj):
+        user_id = obj.user_id
+        super().delete_model(request, obj)
+        self.bump_data_versions({user_id})
+
+    def delete_queryset(self, request, queryset):
+        owners = set(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+        self.bump_data_versions(owners)
+
+    def bump_data_versions(self, user_ids):
+        for user_id in user_ids:
+            User(pk=user_id).bump_data_version()
+
+
+@admin.register(Character)
+class CharacterAdmin(UserDataAdmin):
+    """
+    Characters can be renamed and their flags can be changed here. A
+    character's stars and owner are derived from the log, so those can't be
+    changed here since that wouldn't write any log entries, and the
+    `reconcile_stars` command would report the change as drift. The same goes
+    for adding characters. Use the API instead, or repair the balances
+    afterwards with `reconcile_stars --repair`.
+
+    Deleting characters here doesn't write a `CHARACTER_DELETED` log entry.
+
+    """
+
+    list_display = ("name", "user", "stars", "level", "dead", "iron_man")
+    list_filter = ("dead", "iron_man")
+    list_select_related = ("user",)
+    search_fields = ("name",)
+    readonly_fields = ("user", "stars")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LogEntry)
+class LogEntryAdmin(LargeTableAdmin):
+    """
+    Log entries can only be browsed here. The log is the source of truth for
+    all balances and the ledger checkpoints are derived from it, so editing or
+    deleting entries would silently break historical balances.
+
+    """
+
+    list_display = (
+        "created_at",
+        "user",
+        "character",
+        "type",
+        "amount",
+        "reason",
+        "direct",
+    )
+    list_filter = ("type", "direct")
+    list_select_related = ("user", "character")
+    date_hierarchy = "created_at"
+    ordering = ("-created_at", "-id")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
-from .models import User
 
 admin.site.register(User, UserAdmin)
@@ -1,4 +1,9 @@
+from . import batch
+from . import campaign
 from . import characters
+from . import events
+from . import export
+from . import stats
 from . import user
 
 # TODO: Add tests for the API methods. Tests are not very important here since
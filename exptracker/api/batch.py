@@ -0,0 +1,40 @@
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .idempotency import idempotent
+from .serializers import BatchRequestSerializer, CharacterSerializer
+
+from .. import events
+from ..operations import InvalidOperationError, apply_operations
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+@idempotent
+def apply_batch(request):
+    """
+    Apply an ordered list of operations in a single transaction, see
+    `exptracker/operations.py`. This returns the new number of unspent stars and
+    the modified characters.
+
+    """
+
+    serializer = BatchRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    try:
+        user, characters, pool_delta = apply_operations(
+            request.user, serializer.validated_data["operations"]
+        )
+    except InvalidOperationError as e:
+        raise ValidationError({"operations": str(e)})
+
+    character_data = CharacterSerializer(characters, many=True).data
+    if pool_delta != 0:
+        events.publish(request, "adjustStars", pool_delta)
+    for data in character_data:
+        events.publish(request, "updateCharacter", data)
+
+    return Response({"unspent_stars": user.unspent_stars, "characters": character_data})
@@ -0,0 +1,101 @@
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .params import get_int_param
+
+from ..caching import cached_campaign
+from ..models import Character
+
+# The default and maximum number of characters per leaderboard
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+
+def get_living_characters():
+    """
+    Fetch every living character along with their owner and progression using
+    a single query. Levels and banners are calculated by the database, see
+    `CharacterQuerySet.with_progression()`.
+
+    Returns
+    -------
+    list of dict
+        The characters, sorted by their number of stars in descending order.
+
+    """
+
+    characters = (
+        Character.objects.filter(dead=False)
+        .with_progression()
+        .order_by("-stars", "id")
+        .values(
+            "id",
+            "name",
+            "stars",
+            "iron_man",
+            "progression_level",
+            "progression_banners",
+            "progression_stars",
+            "user_id",
+            "user__username",
+            "user__first_name",
+            "user__last_name",
+        )
+    )
+
+    return [
+        {
+            "id": character["id"],
+            "name": character["name"],
+            "stars": character["stars"],
+            "iron_man": character["iron_man"],
+            "level": character["progression_level"],
+            "banners": character["progression_banners"],
+            "remaining_stars": character["progression_stars"],
+            "user": {
+                "id": character["user_id"],
+                "username": character["user__username"],
+                "first_name": character["user__first_name"],
+                "last_name": character["user__last_name"],
+            },
+        }
+        for character in characters
+    ]
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def campaign_overview(request):
+    """
+    Show every living character in the campaign grouped by player, along with
+    leaderboards of the characters with the most stars. The size of the
+    leaderboards can be changed with the `top` query parameter.
+
+    This is only available to staff members, and the result is cached for a
+    short while, see `caching.cached_campaign()`.
+
+    """
+
+    top = get_int_param(request, "top")
+    if top is None:
+        top = LEADERBOARD_SIZE
+    if not 0 < top <= MAX_LEADERBOARD_SIZE:
+        raise ValidationError(
+            {"top": f"Expected a number between 1 and {MAX_LEADERBOARD_SIZE}."}
+        )
+
+    ranking = cached_campaign(get_living_characters)
+
+    return Response(
+        {
+            "characters": sorted(
+                ranking, key=lambda c: (c["user"]["username"], c["name"], c["id"])
+            ),
+            "leaderboards": {
+                "stars": ranking[:top],
+                "iron_man": [c for c in ranking if c["iron_man"]][:top],
+            },
+        }
+    )
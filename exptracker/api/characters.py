@@ -1,13 +1,40 @@
 from django.db import transaction
-from django.db.models import F
+from django.utils.decorators import method_decorator
 from rest_framework import permissions, viewsets
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from .conditional import data_etag, etag_matches, not_modified, set_etag
+from .idempotency import idempotent
+from .params import get_bool_param, get_datetime_param, get_int_param
 from .serializers import CharacterSerializer, StarRequestSerializer
 
+from .. import events, ledger
+from ..caching import cached_for_user
 from ..models import LogType
+from ..utils import stars_to_level_many
+
+# The values for the `ordering` query parameter and the fields they sort by
+ORDERINGS = {"stars": "stars", "name": "name", "level": "stars"}
+
+
+def get_history_limit(request):
+    """
+    Parse the `limit` query parameter for the star history endpoints, see
+    `ledger.balance_history()`.
+
+    """
+
+    limit = get_int_param(request, "limit")
+    if limit is None:
+        return ledger.HISTORY_LIMIT
+    if not 0 < limit <= ledger.MAX_HISTORY_LIMIT:
+        raise ValidationError(
+            {"limit": f"Expected a number between 1 and {ledger.MAX_HISTORY_LIMIT}."}
+        )
+
+    return limit
 
 
 class CharacterViewSet(viewsets.ModelViewSet):
@@ -24,62 +51,131 @@ class CharacterViewSet(viewsets.ModelViewSet):
       number of stars in place. This is useful when clamining star rewards that
       can only be spent on a certain character.
 
+    The character list can be filtered using the following query parameters:
+
+    - `dead` and `iron_man`, either `true` or `false`.
+    - `min_level` and `max_level`, see `CharacterQuerySet.filter_level()`.
+    - `ordering`, one of `stars`, `name` or `level`, optionally prefixed with a
+      `-` to sort in descending order. Since levels only depend on the number
+      of stars, sorting by level is the same as sorting by stars.
+
+    The character list is sent with an ETag derived from the user's data
+    version, see `exptracker.api.conditional`. The unfiltered list is cached
+    per user, see `exptracker.caching`.
+
     """
 
     serializer_class = CharacterSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.characters.all()
+        queryset = self.request.user.characters.with_progression().filter_level(
+            get_int_param(self.request, "min_level"),
+            get_int_param(self.request, "max_level"),
+        )
+
+        for name in ("dead", "iron_man"):
+            value = get_bool_param(self.request, name)
+            if value is not None:
+                queryset = queryset.filter(**{name: value})
+
+        ordering = self.request.query_params.get("ordering")
+        if ordering is not None:
+            field = ORDERINGS.get(ordering.lstrip("-"))
+            if field is None:
+                raise ValidationError(
+                    {"ordering": f"Expected one of {', '.join(ORDERINGS)}."}
+                )
+
+            direction = "-" if ordering.startswith("-") else ""
+            queryset = queryset.order_by(direction + field, direction + "id")
+
+        return queryset
 
     # TODO: It might be useful to have a method here to 'buy' a high level
     #       character with points, but I'm not sure if that has any added value
     #       except for preventing data races
+    @method_decorator(idempotent)
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
 
-        request.user.logs.create(
+        entry = request.user.logs.create(
             type=LogType.CHARACTER_ADDED,
-            value=response.data,
+            amount=response.data["stars"],
+            character_snapshot=response.data,
             character_id=response.data["id"],
         )
+        ledger.record_entry(entry)
+        events.publish(request, "addCharacter", response.data)
 
         return response
 
-    def destroy(self, request, *args, **kwargs):
-        character_data = CharacterSerializer(self.get_object()).data
-        response = super().destroy(request, *args, **kwargs)
+    def list(self, request, *args, **kwargs):
+        etag = data_etag(request, "characters")
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-        request.user.logs.create(
-            type=LogType.CHARACTER_DELETED, value=character_data, character_id=None
-        )
+        # The unfiltered list is by far the most common request, so we'll
+        # serve that from the cache
+        if request.query_params:
+            response = super().list(request, *args, **kwargs)
+        else:
+            response = Response(
+                cached_for_user(
+                    request.user,
+                    "characters",
+                    lambda: self.get_serializer(self.get_queryset(), many=True).data,
+                )
+            )
+        set_etag(response, etag)
 
         return response
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self.request.user.bump_data_version()
 
+    # This also handles `partial_update()`
+    @method_decorator(idempotent)
     def update(self, request, *args, **kwargs):
-        character = self.get_object()
-        old_stars = character.stars
-        response = super().update(request, *args, **kwargs)
-        new_stars = response.data["stars"]
+        return super().update(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        old_stars = serializer.instance.stars
+        character = serializer.save()
+        self.request.user.bump_data_version()
 
         # As explained above we'll simply log when a character's number of
         # stars changes
-        if old_stars != new_stars:
-            request.user.logs.create(
+        if old_stars != character.stars:
+            entry = self.request.user.logs.create(
                 type=LogType.STARS_SPENT,
-                value={
-                    "amount": new_stars - old_stars,
-                    "reason": response.data.get("reason", None),
-                },
+                amount=character.stars - old_stars,
+                reason=serializer.validated_data.get("reason", None),
+                # These stars don't come from the pool
+                direct=True,
                 character=character,
             )
+            ledger.record_entry(entry)
 
-        return response
+        events.publish(
+            self.request, "updateCharacter", CharacterSerializer(character).data
+        )
+
+    def perform_destroy(self, instance):
+        character_data = CharacterSerializer(instance).data
+        instance.delete()
+        self.request.user.bump_data_version()
+
+        self.request.user.logs.create(
+            type=LogType.CHARACTER_DELETED,
+            character_snapshot=character_data,
+            character_id=None,
+        )
+        events.publish(self.request, "deleteCharacter", character_data["id"])
 
     @action(detail=True, methods=["post"], name="Spend stars from pool")
+    @method_decorator(idempotent)
     def spend(self, request, pk):
         """
         Spend stars from the pool on this character. A negative amount of stars
@@ -96,26 +192,81 @@ class CharacterViewSet(viewsets.ModelViewSet):
 
         character = self.get_object()
         with transaction.atomic():
-            if star_delta > request.user.unspent_stars:
+            # Both of these are conditional updates that will fail instead of
+            # making a balance negative, rolling back the entire transaction
+            if not request.user.adjust_unspent_stars(-star_delta):
                 raise APIException("You do not have enough stars to buy this banner.")
-            if character.stars + star_delta < 0:
+            if not character.adjust_stars(star_delta):
                 raise APIException(
                     "Your character can't have a negative number of stars."
                 )
 
-            character.stars = F("stars") + star_delta
-            request.user.unspent_stars = F("unspent_stars") - star_delta
-
-            character.save()
-            request.user.save()
-
             # TODO: Either create functions for instantiating the individual
             #       log entry types or somehow enforce a schema since this is
             #       easy to get wrong
-            request.user.logs.create(
+            entry = request.user.logs.create(
                 type=LogType.STARS_SPENT,
-                value={"amount": star_delta, "reason": None},
+                amount=star_delta,
                 character=character,
             )
+            ledger.record_entry(entry)
+
+            events.publish(request, "adjustStars", -star_delta)
+            events.publish(
+                request,
+                "adjustCharacterStars",
+                {"id": character.id, "stars": star_delta},
+            )
+
+        return Response(
+            {
+                "spent_stars": star_delta,
+                "stars": character.stars,
+                "unspent_stars": request.user.unspent_stars,
+            }
+        )
+
+    @action(detail=True, methods=["get"], name="Star history")
+    def history(self, request, pk):
+        """
+        Show the character's progression over time, see `exptracker.ledger`.
+
+        With the `at` query parameter this returns the character's progression
+        at that point in time. Otherwise this returns the progression after
+        the most recent changes up to `until`, or after the first changes
+        following `since` if that is passed. The number of changes defaults to
+        `ledger.HISTORY_LIMIT` and can be raised with the `limit` query
+        parameter. Later pages can be fetched by passing the last point's time
+        as `since`.
+
+        """
+
+        character = self.get_object()
+
+        at = get_datetime_param(request, "at")
+        if at is not None:
+            history = [(at, ledger.balance_at(request.user, character, at))]
+        else:
+            history = ledger.balance_history(
+                request.user,
+                character,
+                since=get_datetime_param(request, "since"),
+                until=get_datetime_param(request, "until"),
+                limit=get_history_limit(request),
+            )
+
+        progressions = stars_to_level_many(stars for _, stars in history)
+        points = [
+            {
+                "time": time,
+                "stars": stars,
+                "level": level,
+                "banners": banners,
+                "remaining_stars": remaining_stars,
+            }
+            for (time, stars), (level, banners, remaining_stars) in zip(
+                history, progressions
+            )
+        ]
 
-        return Response({"spent_stars": star_delta})
+        return Response(points[0] if at is not None else points)
@@ -0,0 +1,74 @@
+"""
+Conditional GET support for the endpoints that the front end fetches on every
+page load.
+
+Every user has a data version that gets incremented whenever their characters
+or star pool change, see `User.bump_data_version()`. Since the user has already
+been loaded while authenticating the request, comparing a client's
+`If-None-Match` header to an ETag derived from that version doesn't require
+any additional queries.
+
+"""
+
+import hashlib
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def data_etag(request, name):
+    """
+    Build a strong ETag for a resource based on the current user's data
+    version. Requests with different query parameters get different ETags.
+
+    Parameters
+    ----------
+    request : Request
+        The current request.
+    name : str
+        The resource's name, to distinguish between different resources that
+        share the same data version.
+
+    Returns
+    -------
+    str
+        The quoted ETag.
+
+    """
+
+    tag = f"{name}-{request.user.data_version}"
+    query = request.GET.urlencode()
+    if query:
+        tag += "-" + hashlib.sha1(query.encode()).hexdigest()[:12]
+
+    return f'"{tag}"'
+
+
+def etag_matches(request, etag):
+    """
+    Check whether the client already has the current version of a resource
+    according to its `If-None-Match` header.
+
+    """
+
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+
+    etags = parse_etags(header)
+    return "*" in etags or etag in etags
+
+
+def set_etag(response, etag):
+    response["ETag"] = etag
+    # The response should always be revalidated since the data can change at
+    # any moment
+    response["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+
+    return response
@@ -0,0 +1,86 @@
+import json
+import queue
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.http import HttpResponseForbidden, StreamingHttpResponse
+
+from ..events import RESYNC_EVENT, broker
+
+# Send a comment at least this often in seconds so proxies don't close idle
+# connections
+HEARTBEAT_INTERVAL = 15
+
+# Streams are closed after this many seconds so they don't hold on to a worker
+# thread indefinitely. The browser will reconnect after `RETRY_DELAY`
+# milliseconds.
+MAX_STREAM_DURATION = 60
+RETRY_DELAY = 5000
+
+
+def _stream(subscription):
+    try:
+        # The stream doesn't need the database, so we'll release the connection
+        # opened while authenticating the user
+        connection.close()
+
+        yield f"retry: {RETRY_DELAY}\n\n"
+        if subscription.missed_events:
+            yield f"event: {RESYNC_EVENT}\ndata: null\n\n"
+            return
+
+        yield f"id: {subscription.last_event_id}\n\n"
+
+        deadline = time.monotonic() + MAX_STREAM_DURATION
+        while True:
+            timeout = min(HEARTBEAT_INTERVAL, deadline - time.monotonic())
+            if timeout <= 0:
+                return
+
+            try:
+                event_id, event, data = subscription.queue.get(timeout=timeout)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+
+            lines = []
+            if event_id is not None:
+                lines.append(f"id: {event_id}")
+            if event is not None:
+                lines.append(f"event: {event}")
+                lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+            yield "\n".join(lines) + "\n\n"
+
+            if event == RESYNC_EVENT:
+                return
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def event_stream(request):
+    """
+    A Server-Sent Events stream with changes made to the user's data by their
+    other sessions, see `exptracker.events`. This is a plain Django view since
+    Django REST framework's content negotiation doesn't know about event
+    streams. When the browser reconnects after missing events, the stream only
+    contains a `resync` event.
+
+    """
+
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+
+    subscription = broker.subscribe(
+        request.user.pk,
+        request.GET.get("client_id"),
+        request.META.get("HTTP_LAST_EVENT_ID"),
+    )
+    response = StreamingHttpResponse(
+        _stream(subscription), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Prevents NGINX from buffering the events
+    response["X-Accel-Buffering"] = "no"
+
+    return response
@@ -0,0 +1,114 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+
+from .serializers import CharacterSerializer, LogSerializer
+
+# The number of rows fetched from the database's server side cursor at a time
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    A file-like object that simply returns whatever is written to it. This lets
+    us use `csv.writer` to format rows one at a time.
+
+    """
+
+    def write(self, value):
+        return value
+
+
+def _iter_rows(queryset, serializer_class):
+    """
+    Serialize a queryset one row at a time without loading the entire result
+    set into memory.
+
+    """
+
+    serializer = serializer_class()
+    for instance in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield serializer.to_representation(instance)
+
+
+def _character_rows(user):
+    return _iter_rows(user.characters.order_by("id"), CharacterSerializer)
+
+
+def _log_rows(user):
+    return _iter_rows(user.logs.order_by("created_at", "id"), LogSerializer)
+
+
+# The tables that can be exported to CSV, along with their columns
+CSV_TABLES = {
+    "characters": (_character_rows, ("id", "name", "stars", "dead", "iron_man")),
+    "logs": (_log_rows, ("id", "character", "type", "value", "created_at")),
+}
+
+
+def _stream_ndjson(user):
+    for kind, rows in (("character", _character_rows(user)), ("log", _log_rows(user))):
+        for row in rows:
+            yield json.dumps({"kind": kind, **row}) + "\n"
+
+
+def _stream_csv(user, table):
+    get_rows, columns = CSV_TABLES[table]
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in get_rows(user):
+        # Log values are stored as JSON, so we'll also export them that way
+        yield writer.writerow(
+            [
+                json.dumps(row[column]) if column == "value" else row[column]
+                for column in columns
+            ]
+        )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def export_data(request):
+    """
+    Stream all of the user's characters and log entries, for backups and
+    offline analysis. Rows are read from the database in chunks, so this uses a
+    constant amount of memory regardless of the size of the user's log.
+
+    The `output` query parameter selects the format:
+
+    - `ndjson` (the default) exports both characters and log entries as one
+      JSON object per line, with a `kind` key that's either `character` or
+      `log`.
+    - `csv` exports a single table, selected using the `table` query parameter.
+      This is either `characters` or `logs` (the default).
+
+    """
+
+    output = request.query_params.get("output", "ndjson")
+    if output == "ndjson":
+        response = StreamingHttpResponse(
+            _stream_ndjson(request.user), content_type="application/x-ndjson"
+        )
+        filename = "dungeonesis.ndjson"
+    elif output == "csv":
+        table = request.query_params.get("table", "logs")
+        if table not in CSV_TABLES:
+            raise ValidationError(
+                {"table": f"Expected one of {', '.join(CSV_TABLES)}."}
+            )
+
+        response = StreamingHttpResponse(
+            _stream_csv(request.user, table), content_type="text/csv"
+        )
+        filename = f"dungeonesis-{table}.csv"
+    else:
+        raise ValidationError({"output": "Expected either 'ndjson' or 'csv'."})
+
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    return response
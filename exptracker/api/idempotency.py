@@ -0,0 +1,147 @@
+"""
+Idempotency keys for the endpoints that modify a user's stars or characters.
+
+Clients on unreliable connections can't tell whether a request that timed out
+has been processed or not, and simply retrying a request like spending stars
+would apply it twice. To prevent this, clients can send a unique
+`Idempotency-Key` header with every write request and reuse the same key when
+retrying it. The first successful response for a key is stored in the
+`IdempotencyKey` table for `IDEMPOTENCY_TIMEOUT` seconds, and repeated requests
+with the same key get that response replayed without running the view again.
+Replayed responses have an `Idempotent-Replayed: true` header.
+
+The key is stored in the same transaction as the request's changes, so every
+worker sees it and a key is never stored without the changes or the other way
+around. Keys are unique per user. When a retry arrives while the original
+request is still being processed, inserting its key waits for the original
+transaction to finish. If the original request succeeded the retry's changes
+are rolled back and the original response is replayed, and otherwise the retry
+is processed normally. Failed requests are not stored, since nothing will have
+been changed, so those can simply be retried with the same key. Reusing a key
+for a different request results in a 422 response.
+
+Expired keys are replaced when they get reused, and they can be removed with
+the `prune_idempotency_keys` management command.
+
+"""
+
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from ..models import IdempotencyKey
+from ..stats import registry
+
+HEADER = "Idempotency-Key"
+
+# How long responses are stored for, in seconds
+IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This idempotency key has already been used for another request."
+
+
+def _fingerprint(request):
+    """
+    Identify a request by its method, path and contents, so reusing a key for a
+    different request can be detected.
+
+    """
+
+    contents = json.dumps(request.data, sort_keys=True, default=str)
+
+    return hashlib.sha256(
+        f"{request.method} {request.path}\n{contents}".encode()
+    ).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+
+    registry.increment("idempotency.replay")
+    return Response(
+        stored.response, status=stored.status, headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=IDEMPOTENCY_TIMEOUT)
+
+
+def expired_keys():
+    """
+    Returns
+    -------
+    QuerySet
+        The keys older than `IDEMPOTENCY_TIMEOUT`.
+
+    """
+
+    return IdempotencyKey.objects.filter(created_at__lt=_expiry_cutoff())
+
+
+def idempotent(view):
+    """
+    Add support for the `Idempotency-Key` header to a view. This works for both
+    function based views and, using `method_decorator()`, for viewset methods.
+    Requests without the header are processed normally. With the header the
+    view runs inside of a transaction.
+
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise ValidationError(
+                {HEADER: f"Expected at most {MAX_KEY_LENGTH} characters."}
+            )
+
+        fingerprint = _fingerprint(request)
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+
+        stored = keys.first()
+        if stored is not None:
+            if stored.created_at >= _expiry_cutoff():
+                return _replay(stored, fingerprint)
+
+            stored.delete()
+
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=fingerprint,
+                        status=response.status_code,
+                        response=response.data,
+                    )
+        except IntegrityError:
+            # Another request with the same key has been committed in the
+            # meantime. This request's changes have been rolled back, so we'll
+            # respond as if this was a retry of that request.
+            stored = keys.first()
+            if stored is None:
+                raise
+
+            return _replay(stored, fingerprint)
+
+        return response
+
+    return wrapper
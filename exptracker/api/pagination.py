@@ -0,0 +1,124 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from .params import get_int_param
+
+
+class LogCursorPagination(BasePagination):
+    """
+    Keyset pagination for log entries, newest entries first.
+
+    Pages are selected using the `(created_at, id)` pair of the last entry on
+    the previous page instead of an offset, so every page can be fetched using
+    the `(user, -created_at, -id)` index on `LogEntry` no matter how far back
+    it is. The response contains a `next` cursor that should be passed as the
+    `cursor` query parameter to fetch the next page, or `null` if there are no
+    more entries.
+
+    Clients that keep their own copy of the log can instead pass the highest
+    entry ID they have seen as `since_id` to only fetch newer entries, using
+    the `(user, id)` index. These entries are returned oldest first along with
+    a `high_water_mark` to pass as `since_id` on the next request and a
+    `has_more` flag indicating whether the page size limited the results.
+    Imported entries with timestamps in the past get new IDs, so they're
+    included as well. IDs are assigned when inserting an entry but entries only
+    become visible once their transaction commits, so an entry can show up
+    below a high water mark that has already been returned. Clients should
+    therefore pass an ID somewhat below their high water mark and skip the
+    entries they already have.
+
+    Passing `paginate=false` will return the entire log as a single list like
+    before.
+
+    """
+
+    cursor_query_param = "cursor"
+    since_query_param = "since_id"
+    page_size_query_param = "page_size"
+    unpaginated_query_param = "paginate"
+    page_size = 100
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.unpaginated_query_param) == "false":
+            return None
+
+        page_size = self.get_page_size(request)
+        self.since_id = get_int_param(request, self.since_query_param)
+        if self.since_id is not None:
+            return self.paginate_since(queryset, page_size)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # We'll fetch a single extra entry to find out whether there is a next
+        # page without having to count anything
+        page = list(queryset.order_by("-created_at", "-id")[: page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        else:
+            self.next_cursor = None
+
+        return page
+
+    def paginate_since(self, queryset, page_size):
+        page = list(
+            queryset.filter(id__gt=self.since_id).order_by("id")[: page_size + 1]
+        )
+        self.has_more = len(page) > page_size
+        page = page[:page_size]
+        self.high_water_mark = page[-1].pk if page else self.since_id
+
+        return page
+
+    def get_paginated_response(self, data):
+        if self.since_id is not None:
+            return Response(
+                {
+                    "high_water_mark": self.high_water_mark,
+                    "has_more": self.has_more,
+                    "results": data,
+                }
+            )
+
+        return Response({"next": self.next_cursor, "results": data})
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            created_at, pk = urlsafe_b64decode(encoded.encode()).decode().split(",")
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (DecodeError, UnicodeDecodeError, ValueError):
+            created_at = None
+        if created_at is None:
+            raise NotFound("Invalid cursor.")
+
+        return created_at, pk
+
+    def encode_cursor(self, entry):
+        cursor = f"{entry.created_at.isoformat()},{entry.pk}"
+
+        return urlsafe_b64encode(cursor.encode()).decode()
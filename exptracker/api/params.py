@@ -0,0 +1,77 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def get_int_param(request, name):
+    """
+    Parse an optional integer query parameter.
+
+    Returns
+    -------
+    int or None
+        The parameter's value, or `None` if it was not passed.
+
+    """
+
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Expected an integer."})
+
+
+def get_bool_param(request, name):
+    """
+    Parse an optional boolean query parameter, either `true`/`false` or
+    `1`/`0`.
+
+    Returns
+    -------
+    bool or None
+        The parameter's value, or `None` if it was not passed.
+
+    """
+
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+
+    if value.lower() in {"true", "1"}:
+        return True
+    if value.lower() in {"false", "0"}:
+        return False
+
+    raise ValidationError({name: "Expected 'true' or 'false'."})
+
+
+def get_datetime_param(request, name):
+    """
+    Parse an optional ISO 8601 timestamp query parameter. Timestamps without a
+    time zone are interpreted in the server's time zone.
+
+    Returns
+    -------
+    datetime or None
+        The parameter's value, or `None` if it was not passed.
+
+    """
+
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Expected an ISO 8601 timestamp."})
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+
+    return parsed
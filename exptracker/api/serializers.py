@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from ..models import LogEntry, Character, User
+from ..operations import MAX_OPERATIONS, OPERATION_FIELDS
 
 
 class CharacterSerializer(serializers.ModelSerializer):
@@ -13,10 +14,34 @@ class CharacterSerializer(serializers.ModelSerializer):
 
 
 class LogSerializer(serializers.ModelSerializer):
+    """
+    Serializes log entries in their original format, with all of the entry's
+    data combined into a single `value` object. For character related entries
+    this is the serialized character, and for star related entries this
+    contains the amount, the reason and optionally whether the stars were added
+    to the character directly.
+
+    """
+
+    value = serializers.SerializerMethodField()
+
     class Meta:
         model = LogEntry
         fields = ("id", "character", "type", "value", "created_at")
 
+    def get_value(self, entry):
+        if entry.character_snapshot is not None:
+            return entry.character_snapshot
+        # Entries that have not yet been migrated still use the old JSON column
+        if entry.amount is None:
+            return entry.value
+
+        value = {"amount": entry.amount, "reason": entry.reason}
+        if entry.direct:
+            value["direct"] = True
+
+        return value
+
 
 class StarRequestSerializer(serializers.Serializer):
     """
@@ -33,3 +58,39 @@ class UserInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("first_name", "last_name", "unspent_stars")
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    """
+    A single operation in a batch request. Which fields are required depends on
+    the type of operation, see `exptracker/operations.py`.
+
+    """
+
+    op = serializers.ChoiceField(choices=list(OPERATION_FIELDS))
+    character = serializers.IntegerField(required=False)
+    stars = serializers.IntegerField(required=False)
+    reason = serializers.CharField(allow_null=True, required=False)
+    name = serializers.CharField(max_length=255, required=False)
+    dead = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        missing = [field for field in OPERATION_FIELDS[data["op"]] if field not in data]
+        if missing:
+            raise serializers.ValidationError(
+                {field: "This field is required." for field in missing}
+            )
+
+        return data
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    operations = BatchOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"A batch can contain at most {MAX_OPERATIONS} operations."
+            )
+
+        return operations
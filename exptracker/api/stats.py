@@ -0,0 +1,21 @@
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from ..stats import registry
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([permissions.IsAdminUser])
+def query_stats(request):
+    """
+    Show the query counts and timings for every API endpoint handled by this
+    process along with the process' counters, see `exptracker.stats`. A
+    `DELETE` request resets the statistics.
+
+    """
+
+    if request.method == "DELETE":
+        registry.reset()
+
+    return Response({"endpoints": registry.summary(), "counters": registry.counters()})
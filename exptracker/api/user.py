@@ -1,40 +1,121 @@
+import io
+
 from django.db import transaction
-from django.db.models import F
 from rest_framework import generics, permissions
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
+from .characters import get_history_limit
+from .conditional import data_etag, etag_matches, not_modified, set_etag
+from .idempotency import idempotent
+from .pagination import LogCursorPagination
+from .params import get_datetime_param
 from .serializers import LogSerializer, StarRequestSerializer, UserInfoSerializer
 
+from .. import activity, events, ledger
+from ..importing import FORMATS, InvalidImportError, import_records, read_records
 from ..models import LogType
 
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def adjust_stars(request):
     serializer = StarRequestSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
     stars = serializer.validated_data["stars"]
     with transaction.atomic():
-        if request.user.unspent_stars + stars < 0:
+        if not request.user.adjust_unspent_stars(stars):
             raise APIException(
                 "You can't have a negative number of stars. That would be silly."
             )
 
-        request.user.unspent_stars = F("unspent_stars") + stars
-        request.user.save()
-
         # To make the log actually useful we will also optionally log the cause
         # of this star increase. This value is freeform and can be null.
-        request.user.logs.create(
+        entry = request.user.logs.create(
             type=LogType.STARS_ADDED,
-            value={"amount": stars, "reason": serializer.validated_data.get("reason")},
+            amount=stars,
+            reason=serializer.validated_data.get("reason"),
             character=None,
         )
+        ledger.record_entry(entry)
+
+        events.publish(request, "adjustStars", stars)
+
+    return Response(
+        {"added_stars": stars, "unspent_stars": request.user.unspent_stars}
+    )
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def import_history(request):
+    """
+    Import characters and star history from an uploaded CSV or NDJSON file. The
+    file should be uploaded as `file`, and its format is determined by the
+    `file_format` field or by the file's extension. See
+    `exptracker/importing.py` for more information.
+
+    """
+
+    upload = request.FILES.get("file")
+    if upload is None:
+        raise ValidationError({"file": "Missing file."})
+
+    file_format = request.data.get("file_format") or upload.name.rsplit(".", 1)[-1]
+    if file_format not in FORMATS:
+        raise ValidationError({"file_format": f"Expected one of {', '.join(FORMATS)}."})
+
+    file = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+    try:
+        num_characters, num_logs = import_records(
+            request.user, read_records(file, file_format)
+        )
+    except (InvalidImportError, UnicodeDecodeError) as e:
+        raise ValidationError({"file": str(e)})
+
+    events.publish(request, events.RESYNC_EVENT)
+
+    return Response({"imported_characters": num_characters, "imported_logs": num_logs})
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def star_history(request):
+    """
+    Show the user's number of unspent stars over time. This accepts the same
+    `at`, `since`, `until` and `limit` query parameters as the character
+    history, see `CharacterViewSet.history`.
+
+    """
+
+    at = get_datetime_param(request, "at")
+    if at is not None:
+        return Response(
+            {"time": at, "unspent_stars": ledger.balance_at(request.user, at=at)}
+        )
+
+    history = ledger.balance_history(
+        request.user,
+        since=get_datetime_param(request, "since"),
+        until=get_datetime_param(request, "until"),
+        limit=get_history_limit(request),
+    )
+
+    return Response([{"time": time, "unspent_stars": stars} for time, stars in history])
 
-    return Response({"added_stars": stars})
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def user_stats(request):
+    """
+    Show aggregated activity statistics, see `exptracker.activity`.
+
+    """
+
+    return Response(activity.get_activity(request.user))
 
 
 class UserLogs(generics.ListAPIView):
@@ -42,13 +123,16 @@ class UserLogs(generics.ListAPIView):
     An API view for listing all log entries associated with the currently
     logged in user.
 
+    The entries are paginated using cursors, see `LogCursorPagination`.
+
     """
 
     serializer_class = LogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LogCursorPagination
 
     def get_queryset(self):
-        return self.request.user.logs.order_by("-created_at")
+        return self.request.user.logs.order_by("-created_at", "-id")
 
 
 class UserInfo(generics.RetrieveAPIView):
@@ -60,10 +144,23 @@ class UserInfo(generics.RetrieveAPIView):
     - The user's name
     - How many unspent stars the user has
 
+    Like the character list this is sent with an ETag derived from the user's
+    data version.
+
     """
 
     serializer_class = UserInfoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        etag = data_etag(request, "user")
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        response = super().retrieve(request, *args, **kwargs)
+        set_etag(response, etag)
+
+        return response
+
     def get_object(self):
         return self.request.user
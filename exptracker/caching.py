@@ -0,0 +1,118 @@
+"""
+Per-user caching of computed and serialized data using Django's cache
+framework.
+
+Cache keys include the user's data version, see `User.bump_data_version()`.
+Every write path already increments this version, so cached values never have
+to be deleted explicitly: after a write, the next read simply misses the cache
+and stores the new value under the new key. This works with any cache backend,
+including the local memory and file based backends.
+
+Hits and misses are counted in `exptracker.stats.registry` as
+`cache.<name>.hit` and `cache.<name>.miss`.
+
+Authenticated users themselves are also cached for a short while so requests
+don't need to query the user table, see
+`exptracker.middleware.CachedAuthenticationMiddleware`. These entries are
+deleted once a transaction modifying the user has been committed. Since a worker
+can only delete entries from its own cache, users are only cached when the
+`SHARED_CACHE` setting indicates that every worker uses the same cache.
+
+The campaign overview for DMs combines every user's data, so it can't be keyed
+on a single user's data version. Instead it's deleted whenever any user's data
+version changes and it's only cached for a short while.
+
+"""
+
+from django.core.cache import cache
+
+from .stats import registry
+
+# Old versions are never read again, so this only limits how long they stay
+# around in the cache
+CACHE_TIMEOUT = 60 * 60
+
+# Cached users are invalidated explicitly, but writes that bypass the ORM should
+# not be able to cause stale balances for long
+USER_CACHE_TIMEOUT = 60
+
+# The campaign overview is invalidated on every write as well, but the same
+# goes for writes that don't bump a data version, such as raw SQL
+CAMPAIGN_CACHE_TIMEOUT = 30
+CAMPAIGN_CACHE_KEY = "campaign"
+
+
+def cached_for_user(user, name, compute):
+    """
+    Return a value from the user's cache, computing and storing it on a miss.
+
+    Parameters
+    ----------
+    user : User
+        The user the value belongs to.
+    name : str
+        The name of the cached value.
+    compute : callable
+        A function without arguments that computes the value. The value should
+        be picklable.
+
+    Returns
+    -------
+    object
+        The cached or freshly computed value.
+
+    """
+
+    key = f"{name}:{user.pk}:{user.data_version}"
+    value = cache.get(key)
+    if value is not None:
+        registry.increment(f"cache.{name}.hit")
+        return value
+
+    registry.increment(f"cache.{name}.miss")
+    value = compute()
+    cache.set(key, value, CACHE_TIMEOUT)
+
+    return value
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def get_cached_user(user_id):
+    user = cache.get(user_cache_key(user_id))
+    registry.increment("cache.user.hit" if user is not None else "cache.user.miss")
+
+    return user
+
+
+def set_cached_user(user):
+    cache.set(user_cache_key(user.pk), user, USER_CACHE_TIMEOUT)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def cached_campaign(compute):
+    """
+    Return the campaign overview from the cache, computing and storing it on a
+    miss. See `cached_for_user()`.
+
+    """
+
+    value = cache.get(CAMPAIGN_CACHE_KEY)
+    if value is not None:
+        registry.increment("cache.campaign.hit")
+        return value
+
+    registry.increment("cache.campaign.miss")
+    value = compute()
+    cache.set(CAMPAIGN_CACHE_KEY, value, CAMPAIGN_CACHE_TIMEOUT)
+
+    return value
+
+
+def invalidate_campaign():
+    cache.delete(CAMPAIGN_CACHE_KEY)
@@ -0,0 +1,108 @@
+"""
+Helpers for updating large tables in data migrations without locking them for
+the duration of the migration.
+
+The rows matching a queryset are processed in consecutive primary key ranges of
+`CHUNK_SIZE` keys, and every range is processed in its own transaction. For
+the transactions to actually be committed in between, the migration calling
+these functions has to set `atomic = False`.
+
+The querysets passed to these functions should only match rows that still need
+to be migrated. That way a migration that got interrupted can simply be run
+again, and it will continue where it left off.
+
+"""
+
+from django.db import transaction
+
+# The number of primary keys covered by every transaction
+CHUNK_SIZE = 1000
+
+
+def chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Split a queryset into consecutive primary key ranges.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        The rows to process.
+    chunk_size : int, optional
+        The number of primary keys in every range. Ranges may contain fewer
+        rows than this if there are gaps in the primary keys or if some rows
+        don't match the queryset.
+
+    Yields
+    ------
+    QuerySet
+        `queryset` restricted to a single range of primary keys.
+
+    """
+
+    keys = queryset.order_by("pk").values_list("pk", flat=True)
+    first_key = keys.first()
+    if first_key is None:
+        return
+
+    last_key = keys.last()
+    for start in range(first_key, last_key + 1, chunk_size):
+        yield queryset.filter(pk__gte=start, pk__lt=start + chunk_size)
+
+
+def update_in_chunks(queryset, chunk_size=CHUNK_SIZE, **values):
+    """
+    Run a set based `UPDATE` on a queryset one chunk at a time, committing
+    after every chunk. `values` are passed directly to `QuerySet.update()` and
+    can contain expressions.
+
+    Returns
+    -------
+    int
+        The total number of updated rows.
+
+    """
+
+    updated = 0
+    for chunk in chunks(queryset, chunk_size):
+        with transaction.atomic():
+            updated += chunk.update(**values)
+
+    return updated
+
+
+def bulk_update_in_chunks(queryset, fields, transform, chunk_size=CHUNK_SIZE):
+    """
+    Modify the objects in a queryset in Python and save the changes using a
+    single `bulk_update()` per chunk, committing after every chunk. This is
+    useful for changes that can't be expressed in SQL, such as restructuring
+    JSON values.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        The objects to modify.
+    fields : list of str
+        The fields modified by `transform`.
+    transform : callable
+        A function that modifies a single object in place.
+    chunk_size : int, optional
+        The number of primary keys per chunk.
+
+    Returns
+    -------
+    int
+        The total number of updated objects.
+
+    """
+
+    updated = 0
+    for chunk in chunks(queryset, chunk_size):
+        with transaction.atomic():
+            objects = list(chunk)
+            for obj in objects:
+                transform(obj)
+
+            queryset.model._default_manager.bulk_update(objects, fields)
+            updated += len(objects)
+
+    return updated
@@ -0,0 +1,148 @@
+"""
+Live updates for all of a user's open sessions.
+
+Write paths publish compact deltas named after the front end's Vuex mutations,
+such as `adjustStars` or `updateCharacter`. These are pushed to the user's
+other sessions through the Server-Sent Events stream at `/api/events/`, so
+they can apply the same mutation instead of refetching everything.
+
+The broker lives in memory, so events only reach sessions connected to the
+same process. Every open stream also occupies a worker thread, so streams are
+closed after a while and the browser reconnects on its own. Every event has an
+ID that the browser sends back when reconnecting, which is used to tell the
+client to reload its data when it missed any events in between. Event IDs
+include a random token identifying the process, so reconnecting to another
+process always results in a reload.
+
+"""
+
+import queue
+import threading
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+
+# Sessions that fall this many events behind are told to reload all of their
+# data instead
+MAX_PENDING_EVENTS = 100
+
+# The name of the event sent when a client has to refetch all of its data
+RESYNC_EVENT = "resync"
+
+
+class Subscription:
+    """
+    A single open event stream.
+
+    Attributes
+    ----------
+    client_id : str or None
+        An identifier generated by the front end, used to avoid sending events
+        back to the session that caused them.
+    last_event_id : str
+        The ID of the last event published for the user when subscribing.
+    missed_events : bool
+        Whether the client reconnected after missing events, in which case it
+        should reload its data.
+    queue : Queue
+        The pending `(event_id, event, data)` tuples. `event` is `None` for
+        events caused by this session, which only update the event ID.
+
+    """
+
+    def __init__(self, user_id, client_id, last_event_id, missed_events):
+        self.user_id = user_id
+        self.client_id = client_id
+        self.last_event_id = last_event_id
+        self.missed_events = missed_events
+        self.queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        # The number of events published for every user so far
+        self._event_counts = defaultdict(int)
+        self._token = uuid.uuid4().hex[:8]
+
+    def _event_id(self, user_id):
+        return f"{self._token}-{self._event_counts[user_id]}"
+
+    def subscribe(self, user_id, client_id=None, last_event_id=None):
+        """
+        Open a new subscription for a user. When reconnecting, `last_event_id`
+        should be set to the ID of the last event the client received.
+
+        """
+
+        with self._lock:
+            event_id = self._event_id(user_id)
+            missed_events = last_event_id is not None and last_event_id != event_id
+            subscription = Subscription(user_id, client_id, event_id, missed_events)
+            self._subscriptions[user_id].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.user_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, client_id, event, data):
+        """
+        Send an event to all of a user's sessions except for the one with the
+        given client ID.
+
+        """
+
+        with self._lock:
+            self._event_counts[user_id] += 1
+            event_id = self._event_id(user_id)
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+
+        for subscription in subscriptions:
+            # The session that caused the event already knows about it, but it
+            # still needs the new ID to be able to reconnect without reloading
+            if client_id is not None and subscription.client_id == client_id:
+                item = (event_id, None, None)
+            else:
+                item = (event_id, event, data)
+
+            try:
+                subscription.queue.put_nowait(item)
+            except queue.Full:
+                # The stream will end after this, so there's no need to keep
+                # the older events around
+                with subscription.queue.mutex:
+                    subscription.queue.queue.clear()
+                subscription.queue.put_nowait((None, RESYNC_EVENT, None))
+
+
+broker = EventBroker()
+
+
+def publish(request, event, data=None):
+    """
+    Publish an event to the current user's other sessions once the current
+    transaction commits. Nothing will be sent if the transaction gets rolled
+    back.
+
+    Parameters
+    ----------
+    request : Request
+        The request that caused the change. The `X-Client-Id` header is used
+        to skip the session that sent this request.
+    event : str
+        The name of the Vuex mutation the other sessions should apply.
+    data
+        The mutation's payload. This should be JSON serializable.
+
+    """
+
+    user_id = request.user.pk
+    client_id = request.META.get("HTTP_X_CLIENT_ID")
+    transaction.on_commit(lambda: broker.publish(user_id, client_id, event, data))
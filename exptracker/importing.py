@@ -0,0 +1,279 @@
+"""
+Bulk importing of characters and star history, used to move existing
+spreadsheets into the tracker.
+
+Import files contain one record per row, either as CSV with a header row or as
+newline delimited JSON objects. Every record has the following fields:
+
+- `type`: either `CHARACTER_ADDED`, `STARS_ADDED` or `STARS_SPENT`. The
+  `LogType.` prefix used in exports is optional.
+- `character`: the character's name. Characters have to be added before stars
+  can be spent on them, either earlier in the same file or through the tracker
+  itself.
+- `amount`: the number of stars. For `CHARACTER_ADDED` this is the character's
+  initial number of stars, for `STARS_ADDED` the number of stars added to the
+  pool, and for `STARS_SPENT` the number of stars moved from the pool to the
+  character.
+- `reason`: an optional description, like in the log.
+- `created_at`: an optional ISO 8601 timestamp. Defaults to the current time.
+- `dead` and `iron_man`: optional flags for `CHARACTER_ADDED` records.
+
+The entire import happens in a single transaction. Log entries are inserted in
+batches and the user's and the characters' balances are only updated once at
+the end.
+
+"""
+
+import csv
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import ledger
+from .models import Character, LogEntry, LogType, User
+
+# The number of log entries to insert per query
+BATCH_SIZE = 1000
+
+FORMATS = ("csv", "ndjson")
+
+
+class InvalidImportError(Exception):
+    """
+    Raised when an import file contains an invalid record. Nothing will have
+    been imported when this is raised.
+
+    """
+
+    def __init__(self, message, line=None):
+        if line is not None:
+            message = f"Line {line}: {message}"
+
+        super().__init__(message)
+
+
+def read_records(file, file_format):
+    """
+    Read the records from an import file one at a time.
+
+    Parameters
+    ----------
+    file : file
+        A text mode file object.
+    file_format : str
+        Either `csv` or `ndjson`.
+
+    Yields
+    ------
+    line : int
+        The line the record was read from, used in error messages.
+    record : dict
+        The record's fields.
+
+    """
+
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == "ndjson":
+        for line, contents in enumerate(file, start=1):
+            if not contents.strip():
+                continue
+
+            try:
+                record = json.loads(contents)
+            except ValueError:
+                raise InvalidImportError("Invalid JSON.", line)
+            if not isinstance(record, dict):
+                raise InvalidImportError("Expected a JSON object.", line)
+
+            yield line, record
+    else:
+        raise ValueError(f"Unknown import format '{file_format}'.")
+
+
+def _parse_type(value, line):
+    type_name = str(value or "")
+    if type_name.startswith("LogType."):
+        type_name = type_name[len("LogType.") :]
+
+    if type_name not in {"CHARACTER_ADDED", "STARS_ADDED", "STARS_SPENT"}:
+        raise InvalidImportError(f"Unsupported record type '{value}'.", line)
+
+    return LogType[type_name]
+
+
+def _parse_amount(value, line):
+    try:
+        amount = int(value)
+    except (TypeError, ValueError):
+        raise InvalidImportError("The amount must be an integer.", line)
+
+    return amount
+
+
+def _parse_bool(value, line):
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+
+    value = str(value).strip().lower()
+    if value in {"", "0", "false", "no"}:
+        return False
+    if value in {"1", "true", "yes"}:
+        return True
+
+    raise InvalidImportError(f"Invalid boolean '{value}'.", line)
+
+
+def _parse_created_at(value, line):
+    if not value:
+        return timezone.now()
+
+    created_at = parse_datetime(str(value))
+    if created_at is None:
+        raise InvalidImportError(f"Invalid timestamp '{value}'.", line)
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+
+    return created_at
+
+
+def import_records(user, records):
+    """
+    Import characters and star history for a user.
+
+    Parameters
+    ----------
+    user : User
+        The user to import the records for.
+    records : iterable of (int, dict)
+        The records to import, as returned by `read_records()`.
+
+    Returns
+    -------
+    characters : int
+        The number of characters that have been added.
+    logs : int
+        The number of log entries that have been added.
+
+    Raises
+    ------
+    InvalidImportError
+        When any of the records is invalid or when the import would result in a
+        negative number of stars. The transaction will be rolled back in that
+        case.
+
+    """
+
+    with transaction.atomic():
+        user = User.objects.select_for_update().get(pk=user.pk)
+        characters = {
+            character.name: character
+            for character in user.characters.select_for_update()
+        }
+        pool_delta = 0
+        star_deltas = defaultdict(int)
+        num_characters = 0
+        num_logs = 0
+
+        pending = []
+        for line, record in records:
+            log_type = _parse_type(record.get("type"), line)
+            name = record.get("character") or None
+            amount = _parse_amount(record.get("amount"), line)
+            reason = record.get("reason") or None
+            created_at = _parse_created_at(record.get("created_at"), line)
+
+            if log_type == LogType.CHARACTER_ADDED:
+                if name is None:
+                    raise InvalidImportError("Missing character name.", line)
+                if name in characters:
+                    raise InvalidImportError(f"'{name}' already exists.", line)
+                if amount < 0:
+                    raise InvalidImportError(
+                        "A character can't start with a negative number of stars.",
+                        line,
+                    )
+
+                # There are usually only a handful of these, and we need their
+                # IDs for the log entries
+                character = Character.objects.create(
+                    user=user,
+                    name=name,
+                    stars=amount,
+                    dead=_parse_bool(record.get("dead"), line),
+                    iron_man=_parse_bool(record.get("iron_man"), line),
+                )
+                characters[name] = character
+                num_characters += 1
+
+                snapshot = {
+                    "id": character.id,
+                    "name": character.name,
+                    "stars": character.stars,
+                    "dead": character.dead,
+                    "iron_man": character.iron_man,
+                }
+            elif log_type == LogType.STARS_ADDED:
+                character = None
+                snapshot = None
+                pool_delta += amount
+            else:
+                if name not in characters:
+                    raise InvalidImportError(f"Unknown character '{name}'.", line)
+
+                character = characters[name]
+                snapshot = None
+                pool_delta -= amount
+                star_deltas[name] += amount
+
+            pending.append(
+                LogEntry(
+                    user=user,
+                    character=character,
+                    type=log_type,
+                    amount=amount,
+                    reason=reason,
+                    character_snapshot=snapshot,
+                    created_at=created_at,
+                )
+            )
+            if len(pending) >= BATCH_SIZE:
+                LogEntry.objects.bulk_create(pending)
+                num_logs += len(pending)
+                pending = []
+
+        LogEntry.objects.bulk_create(pending)
+        num_logs += len(pending)
+
+        # The balances are only validated once everything has been imported,
+        # since the order of the records doesn't matter for the end result
+        if user.unspent_stars + pool_delta < 0:
+            raise InvalidImportError(
+                "This import would result in a negative number of unspent stars."
+            )
+
+        updated_characters = []
+        for name, delta in star_deltas.items():
+            character = characters[name]
+            character.stars += delta
+            if character.stars < 0:
+                raise InvalidImportError(
+                    f"This import would give '{name}' a negative number of stars."
+                )
+
+            updated_characters.append(character)
+
+        Character.objects.bulk_update(updated_characters, ["stars"])
+        user.unspent_stars += pool_delta
+        user.data_version += 1
+        user.save(update_fields=["unspent_stars", "data_version"])
+
+        # The imported entries can be older than the existing checkpoints
+        ledger.rebuild_checkpoints(user)
+
+    return num_characters, num_logs
@@ -0,0 +1,269 @@
+"""
+Historical balances derived from the log.
+
+A user's pool of unspent stars and every character's number of stars can be
+reconstructed by replaying the `STARS_ADDED`, `STARS_SPENT` and
+`CHARACTER_ADDED` log entries. To avoid replaying a user's entire history for
+every query, a `BalanceCheckpoint` is written every `CHECKPOINT_INTERVAL` log
+entries per account, where an account is either a single character or a user's
+pool. A balance at any point in time can then be calculated from the nearest
+checkpoint and the log entries after it.
+
+Checking whether an account needs a new checkpoint takes a couple of queries,
+so new log entries only trigger that check once every `CHECK_INTERVAL` entry
+IDs, see `record_entry()`. Log entry IDs are shared between all accounts, so an
+account will typically have somewhere around `CHECKPOINT_INTERVAL +
+CHECK_INTERVAL` entries between two checkpoints. This only affects how many
+entries have to be replayed, the calculated balances are always exact.
+
+Log entries are ordered by `(created_at, id)` throughout this module.
+
+"""
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import BalanceCheckpoint, LogType
+
+# The number of log entries per account between two checkpoints
+CHECKPOINT_INTERVAL = 100
+
+# New log entries only check whether a checkpoint is needed if their ID is a
+# multiple of this number
+CHECK_INTERVAL = 10
+
+
+# The default and maximum number of changes returned by `balance_history()`
+HISTORY_LIMIT = 100
+MAX_HISTORY_LIMIT = 1000
+
+# The log entry fields needed to calculate balances
+DELTA_FIELDS = ("type", "amount", "direct")
+
+
+def character_delta(log_type, amount, direct):
+    """
+    Calculate how much a log entry changes its character's number of stars.
+
+    """
+
+    log_type = str(log_type)
+    if log_type in {str(LogType.CHARACTER_ADDED), str(LogType.STARS_SPENT)}:
+        return amount or 0
+
+    return 0
+
+
+def pool_delta(log_type, amount, direct):
+    """
+    Calculate how much a log entry changes the user's pool of unspent stars.
+    Stars spent through direct edits don't come from the pool.
+
+    """
+
+    log_type = str(log_type)
+    if log_type == str(LogType.STARS_ADDED):
+        return amount or 0
+    if log_type == str(LogType.STARS_SPENT) and not direct:
+        return -(amount or 0)
+
+    return 0
+
+
+def _account_logs(user, character):
+    if character is None:
+        return user.logs.filter(type__in=[LogType.STARS_ADDED, LogType.STARS_SPENT])
+
+    return user.logs.filter(character=character)
+
+
+def _delta_function(character):
+    return pool_delta if character is None else character_delta
+
+
+def _nearest_checkpoint(user, character, at=None):
+    checkpoints = BalanceCheckpoint.objects.filter(user=user, character=character)
+    if at is not None:
+        checkpoints = checkpoints.filter(created_at__lte=at)
+
+    return checkpoints.order_by("-created_at", "-log_entry_id").first()
+
+
+def _entries_after(user, character, checkpoint):
+    logs = _account_logs(user, character)
+    if checkpoint is not None:
+        logs = logs.filter(
+            Q(created_at__gt=checkpoint.created_at)
+            | Q(created_at=checkpoint.created_at, id__gt=checkpoint.log_entry_id)
+        )
+
+    return logs.order_by("created_at", "id")
+
+
+def balance_at(user, character=None, at=None):
+    """
+    Calculate a balance at some point in time.
+
+    Parameters
+    ----------
+    user : User
+        The user the balance belongs to.
+    character : Character, optional
+        The character whose number of stars should be calculated. If this is
+        omitted, the user's pool of unspent stars will be used instead.
+    at : datetime, optional
+        The point in time. Defaults to the current balance.
+
+    Returns
+    -------
+    int
+        The balance at `at`.
+
+    """
+
+    checkpoint = _nearest_checkpoint(user, character, at)
+    balance = checkpoint.balance if checkpoint is not None else 0
+
+    logs = _entries_after(user, character, checkpoint)
+    if at is not None:
+        logs = logs.filter(created_at__lte=at)
+
+    delta = _delta_function(character)
+    for fields in logs.values_list(*DELTA_FIELDS):
+        balance += delta(*fields)
+
+    return balance
+
+
+def balance_history(user, character=None, since=None, until=None, limit=HISTORY_LIMIT):
+    """
+    Calculate how a balance changed over time. At most `limit` changes are
+    included so a long history never has to be replayed in full. Without
+    `since` these are the most recent changes, which are calculated backwards
+    from the current balance.
+
+    Parameters
+    ----------
+    user : User
+        The user the balance belongs to.
+    character : Character, optional
+        The character whose number of stars should be used. If this is
+        omitted, the user's pool of unspent stars will be used instead.
+    since : datetime, optional
+        Only include the first changes after this point in time. The balance at
+        this point will be the first element in the history.
+    until : datetime, optional
+        Only include changes up to and including this point in time.
+    limit : int, optional
+        The maximum number of changes to include.
+
+    Returns
+    -------
+    list of (datetime, int)
+        The balance after every change, in chronological order.
+
+    """
+
+    logs = _account_logs(user, character)
+    if until is not None:
+        logs = logs.filter(created_at__lte=until)
+
+    delta = _delta_function(character)
+    if since is None:
+        balance = balance_at(user, character, until)
+        history = []
+        for created_at, *fields in logs.order_by("-created_at", "-id").values_list(
+            "created_at", *DELTA_FIELDS
+        )[:limit]:
+            history.append((created_at, balance))
+            balance -= delta(*fields)
+
+        return history[::-1]
+
+    balance = balance_at(user, character, since)
+    history = [(since, balance)]
+    for created_at, *fields in (
+        logs.filter(created_at__gt=since)
+        .order_by("created_at", "id")
+        .values_list("created_at", *DELTA_FIELDS)[:limit]
+    ):
+        balance += delta(*fields)
+        history.append((created_at, balance))
+
+    return history
+
+
+def update_checkpoints(user, character=None):
+    """
+    Write checkpoints for an account if there have been at least
+    `CHECKPOINT_INTERVAL` log entries since the last checkpoint.
+
+    Parameters
+    ----------
+    user : User
+        The user the account belongs to.
+    character : Character, optional
+        The character to write checkpoints for. If this is omitted, the user's
+        pool of unspent stars will be used instead.
+
+    """
+
+    checkpoint = _nearest_checkpoint(user, character)
+    logs = _entries_after(user, character, checkpoint)
+    # We only need to know whether there are enough entries, so there's no need
+    # to count all of them
+    if logs[:CHECKPOINT_INTERVAL].count() < CHECKPOINT_INTERVAL:
+        return
+
+    balance = checkpoint.balance if checkpoint is not None else 0
+    delta = _delta_function(character)
+    checkpoints = []
+    for i, (log_entry_id, created_at, *fields) in enumerate(
+        logs.values_list("id", "created_at", *DELTA_FIELDS).iterator(), start=1
+    ):
+        balance += delta(*fields)
+        if i % CHECKPOINT_INTERVAL == 0:
+            checkpoints.append(
+                BalanceCheckpoint(
+                    user=user,
+                    character=character,
+                    log_entry_id=log_entry_id,
+                    created_at=created_at,
+                    balance=balance,
+                )
+            )
+
+    BalanceCheckpoint.objects.bulk_create(checkpoints)
+
+
+def record_entry(entry):
+    """
+    Update the checkpoints for the accounts affected by a newly created log
+    entry. This should be called after every log entry that gets created. To
+    keep writes cheap, this only does anything for one in every
+    `CHECK_INTERVAL` entries.
+
+    """
+
+    if entry.pk % CHECK_INTERVAL != 0:
+        return
+
+    if entry.character_id is not None:
+        update_checkpoints(entry.user, entry.character)
+    if str(entry.type) in {str(LogType.STARS_ADDED), str(LogType.STARS_SPENT)}:
+        update_checkpoints(entry.user)
+
+
+def rebuild_checkpoints(user):
+    """
+    Replace all of a user's checkpoints. This is needed after inserting log
+    entries in the past, such as when importing old history.
+
+    """
+
+    with transaction.atomic():
+        user.checkpoints.all().delete()
+
+        update_checkpoints(user)
+        for character in user.characters.all():
+            update_checkpoints(user, character)
@@ -0,0 +1,160 @@
+import json
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from ...models import User
+from ...stats import PERCENTILES, percentile
+from .seed_load import USERNAME_PREFIX
+
+
+def build_requests(user, character_id):
+    """
+    The requests sent for a single user in every round. Adjusting the pool and
+    spending from it cancel each other out, so running the benchmark doesn't
+    cause the generated data to drift too much.
+
+    Returns
+    -------
+    list of (str, str, str, dict)
+        The route's name, the HTTP method, the URL and the request's data.
+
+    """
+
+    character_url = f"/api/characters/{character_id}/"
+
+    return [
+        ("list characters", "get", "/api/characters/", None),
+        ("retrieve character", "get", character_url, None),
+        ("update character", "patch", character_url, {"name": "Renamed"}),
+        ("adjust stars", "post", "/api/user/adjust/", {"stars": 1}),
+        ("spend stars", "post", f"{character_url}spend/", {"stars": 1}),
+        ("character history", "get", f"{character_url}history/", None),
+        ("user info", "get", "/api/user/", None),
+        ("logs", "get", "/api/user/logs/", None),
+        ("star history", "get", "/api/user/history/", None),
+        ("user stats", "get", "/api/user/stats/", None),
+        ("export", "get", "/api/user/export/", None),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API end to end using the users created by `seed_load`. "
+        "This reports latency percentiles and the throughput for every route, "
+        "and can compare the results against a previously saved baseline. The "
+        "import and event stream endpoints are not included. Note that this "
+        "modifies the generated users' data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=20,
+            help="The number of times to send every request for every user.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=10,
+            help="The maximum number of generated users to send requests as.",
+        )
+        parser.add_argument(
+            "--baseline", help="A JSON file with results to compare against."
+        )
+        parser.add_argument(
+            "--save", help="Save the results to a JSON file to use as a baseline."
+        )
+
+    def handle(self, *args, **options):
+        users = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("id")[
+                : options["users"]
+            ]
+        )
+        if not users:
+            raise CommandError("No generated users found, run `seed_load` first.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        clients = []
+        for user in users:
+            character_id = user.characters.values_list("id", flat=True).first()
+            if character_id is None:
+                raise CommandError(f"User '{user.username}' has no characters.")
+
+            client = APIClient()
+            client.force_authenticate(user)
+            clients.append((client, build_requests(user, character_id)))
+
+        timings = defaultdict(list)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for _ in range(options["rounds"]):
+                for client, requests in clients:
+                    for name, method, url, data in requests:
+                        timings[name].append(self.send(client, method, url, data))
+
+        results = {name: self.summarize(times) for name, times in timings.items()}
+        self.report(results, baseline)
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def send(self, client, method, url, data):
+        """
+        Send a single request and return the time in seconds it took to fully
+        receive the response.
+
+        """
+
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data, format="json")
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - start
+
+        if response.status_code != 200:
+            raise CommandError(
+                f"{method.upper()} {url} returned status {response.status_code}."
+            )
+
+        return elapsed
+
+    def summarize(self, times):
+        summary = {"requests": len(times), "throughput": len(times) / sum(times)}
+        for p in PERCENTILES:
+            summary[f"ms_p{p}"] = percentile(times, p) * 1000
+
+        return summary
+
+    def report(self, results, baseline):
+        header = "".join(f"{f'p{p} (ms)':>12}" for p in PERCENTILES)
+        self.stdout.write(f"{'route':<20}{header}{'req/s':>12}")
+
+        for name, summary in results.items():
+            line = f"{name:<20}"
+            for p in PERCENTILES:
+                line += f"{summary[f'ms_p{p}']:12.2f}"
+            line += f"{summary['throughput']:12.1f}"
+
+            # Show the relative change in median latency and throughput
+            if baseline is not None and name in baseline:
+                old = baseline[name]
+                latency_change = summary["ms_p50"] / old["ms_p50"] - 1
+                throughput_change = summary["throughput"] / old["throughput"] - 1
+                line += (
+                    f"   p50 {latency_change:+7.1%}, "
+                    f"req/s {throughput_change:+7.1%}"
+                )
+
+            self.stdout.write(line)
@@ -0,0 +1,123 @@
+import io
+import random
+import timeit
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ... import renderers
+from ...api.serializers import LogSerializer
+from ...models import LogEntry, LogType
+
+REASONS = [None, "", "Quest reward", "Art – portrait of Ælfrida", "DM'ing 🐉"]
+
+
+def generate_logs(count):
+    """
+    Generate a list of unsaved log entries resembling those of a long running
+    campaign, including the older entries that still use the JSON column.
+
+    """
+
+    now = timezone.now()
+    logs = []
+    for pk in range(1, count + 1):
+        log_type = random.choice(list(LogType))
+        entry = LogEntry(
+            id=pk,
+            user_id=1,
+            character_id=random.randint(1, 20),
+            type=str(log_type),
+            created_at=now - timedelta(seconds=random.randint(0, 10**8)),
+        )
+
+        if log_type in (LogType.CHARACTER_ADDED, LogType.CHARACTER_DELETED):
+            entry.character_snapshot = {
+                "id": entry.character_id,
+                "name": f"Character {entry.character_id} «Ünïcødé»",
+                "stars": random.randint(0, 200),
+                "dead": random.random() < 0.1,
+                "iron_man": random.random() < 0.1,
+            }
+        elif random.random() < 0.2:
+            entry.value = {"amount": random.randint(1, 10), "reason": "Legacy"}
+        else:
+            entry.amount = random.randint(1, 10)
+            entry.reason = random.choice(REASONS)
+            entry.direct = log_type == LogType.STARS_SPENT and random.random() < 0.2
+
+        logs.append(entry)
+
+    return logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the fast JSON renderer and parser against Django REST "
+        "Framework's defaults on a large list of log entries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=10000,
+            help="The number of log entries to render per run.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="The number of runs to time."
+        )
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError(
+                "orjson is not installed, the fast renderer would fall back to "
+                "the default implementation."
+            )
+
+        logs = generate_logs(options["size"])
+        data = LogSerializer(logs, many=True).data
+        # Data that hasn't gone through a serializer may still contain
+        # datetimes, so those should also be rendered the same way
+        raw_data = [
+            {"time": entry.created_at, "date": entry.created_at.date()}
+            for entry in logs
+        ]
+
+        # The fast implementations should be drop-in replacements, so we'll
+        # verify that first
+        default_renderer = JSONRenderer()
+        fast_renderer = renderers.FastJSONRenderer()
+        rendered = default_renderer.render(data)
+        assert fast_renderer.render(data) == rendered
+        assert fast_renderer.render(raw_data) == default_renderer.render(raw_data)
+        assert fast_renderer.render({"line": "\u2028\u2029"}) == (
+            default_renderer.render({"line": "\u2028\u2029"})
+        )
+
+        default_parser = JSONParser()
+        fast_parser = renderers.FastJSONParser()
+        parsed = default_parser.parse(io.BytesIO(rendered))
+        assert fast_parser.parse(io.BytesIO(rendered)) == parsed
+
+        timings = {
+            "JSONRenderer": lambda: default_renderer.render(data),
+            "FastJSONRenderer": lambda: fast_renderer.render(data),
+            "JSONParser": lambda: default_parser.parse(io.BytesIO(rendered)),
+            "FastJSONParser": lambda: fast_parser.parse(io.BytesIO(rendered)),
+        }
+
+        self.stdout.write(f"Rendered size: {len(rendered) / 1024:.1f} KiB")
+        baseline = None
+        for i, (name, function) in enumerate(timings.items()):
+            best = min(timeit.repeat(function, number=1, repeat=options["repeat"]))
+            # Both the renderers and the parsers are compared to their defaults
+            if i % 2 == 0:
+                baseline = best
+
+            self.stdout.write(
+                f"{name:<20} {best * 1000:8.3f} ms  ({baseline / best:5.1f}x)"
+            )
@@ -0,0 +1,80 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import (
+    LEVELS,
+    STARS_FOR_LEVEL,
+    STARS_PER_BANNER,
+    stars_to_level,
+    stars_to_level_many,
+)
+
+
+def reference_stars_to_level(character_stars):
+    """
+    The original linear scan implementation of `stars_to_level()`, kept around
+    to compare both the results and the performance against.
+
+    """
+
+    level, level_cost = next(
+        (
+            (level, STARS_FOR_LEVEL[level])
+            for level in reversed(LEVELS)
+            if character_stars >= STARS_FOR_LEVEL[level]
+        ),
+        (0, STARS_FOR_LEVEL[2]),
+    )
+
+    banner_cost = STARS_PER_BANNER[level]
+    banners = (character_stars - level_cost) // banner_cost
+    remaining_stars = character_stars - level_cost - (banners * banner_cost)
+
+    return level, banners, remaining_stars
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the star to level conversion functions against the original "
+        "implementation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=10000,
+            help="The number of star counts to convert per run.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="The number of runs to time."
+        )
+
+    def handle(self, *args, **options):
+        max_stars = STARS_FOR_LEVEL[LEVELS[-1]] + 200
+        stars = [random.randint(0, max_stars) for _ in range(options["size"])]
+
+        # The new implementations should be drop-in replacements, so we'll
+        # verify that first. This is also covered by the test suite.
+        expected = [reference_stars_to_level(s) for s in range(max_stars)]
+        if [stars_to_level(s) for s in range(max_stars)] != expected:
+            raise CommandError("stars_to_level() does not match the reference")
+        if stars_to_level_many(range(max_stars)) != expected:
+            raise CommandError("stars_to_level_many() does not match the reference")
+
+        timings = {
+            "reference": lambda: [reference_stars_to_level(s) for s in stars],
+            "stars_to_level": lambda: [stars_to_level(s) for s in stars],
+            "stars_to_level_many": lambda: stars_to_level_many(stars),
+        }
+
+        baseline = None
+        for name, function in timings.items():
+            best = min(timeit.repeat(function, number=1, repeat=options["repeat"]))
+            baseline = baseline or best
+
+            self.stdout.write(
+                f"{name:<20} {best * 1000:8.3f} ms  ({baseline / best:5.1f}x)"
+            )
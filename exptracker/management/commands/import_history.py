@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...importing import FORMATS, InvalidImportError, import_records, read_records
+from ...models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import characters and star history for a user from a CSV or NDJSON file. "
+        "See exptracker/importing.py for the file format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="The user to import the records for.")
+        parser.add_argument("path", help="The file to import.")
+        parser.add_argument(
+            "--file-format",
+            choices=FORMATS,
+            help="The file's format. Defaults to the file's extension.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user '{options['username']}'.")
+
+        file_format = options["file_format"]
+        if file_format is None:
+            file_format = os.path.splitext(options["path"])[1].lstrip(".").lower()
+            if file_format not in FORMATS:
+                raise CommandError(
+                    "Could not determine the file's format, use --file-format."
+                )
+
+        with open(options["path"], newline="", encoding="utf-8") as file:
+            try:
+                num_characters, num_logs = import_records(
+                    user, read_records(file, file_format)
+                )
+            except InvalidImportError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {num_characters} characters and {num_logs} log entries."
+            )
+        )
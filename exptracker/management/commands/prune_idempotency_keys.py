@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...api.idempotency import expired_keys
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove the stored responses for idempotency keys that have expired. "
+        "This can be run periodically, for instance from a daily cron job."
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = expired_keys().delete()
+        self.stdout.write(f"Removed {deleted} expired idempotency keys.")
@@ -0,0 +1,73 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from ...models import User
+from ...stats import registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Send read-only requests to the API on behalf of a user and dump the "
+        "resulting per-endpoint query counts and timings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="The user to send requests as.")
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="The number of times to request every endpoint.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Output the statistics as JSON."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user '{options['username']}'.")
+
+        urls = ["/api/characters/", "/api/user/", "/api/user/logs/"]
+        urls += [
+            f"/api/characters/{pk}/"
+            for pk in user.characters.values_list("id", flat=True)
+        ]
+
+        client = APIClient()
+        client.force_authenticate(user)
+        registry.reset()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for _ in range(options["repeat"]):
+                for url in urls:
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f"GET {url} returned status {response.status_code}."
+                        )
+
+        summary = registry.summary()
+        counters = registry.counters()
+        if options["json"]:
+            self.stdout.write(
+                json.dumps({"endpoints": summary, "counters": counters}, indent=2)
+            )
+            return
+
+        for endpoint, stats in summary.items():
+            self.stdout.write(
+                f"{endpoint}\n"
+                f"  requests: {stats['requests']}, "
+                f"queries: {stats['queries_p50']} (max {stats['max_queries']})\n"
+                f"  sql   p50/p95/p99: {stats['sql_ms_p50']:.2f} / "
+                f"{stats['sql_ms_p95']:.2f} / {stats['sql_ms_p99']:.2f} ms\n"
+                f"  total p50/p95/p99: {stats['wall_ms_p50']:.2f} / "
+                f"{stats['wall_ms_p95']:.2f} / {stats['wall_ms_p99']:.2f} ms"
+            )
+        for counter, value in counters.items():
+            self.stdout.write(f"{counter}: {value}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ... import ledger
+from ...models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the balance checkpoints used for historical balance queries. "
+        "This should be run once for existing data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="The users to rebuild the checkpoints for. Defaults to all users.",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        for user in users.iterator():
+            ledger.rebuild_checkpoints(user)
+            self.stdout.write(f"Rebuilt the checkpoints for {user.username}.")
@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max, Min
+
+from ...models import User
+from ...reconciliation import reconcile_range
+
+
+def _init_worker():
+    # Worker processes that weren't forked still need to load Django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every user's pool of unspent stars and their characters' stars "
+        "to the totals derived from the log, and optionally overwrite the "
+        "balances that don't match. Users are checked in ranges of primary keys "
+        "spread over multiple processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help=(
+                "Overwrite drifted balances with the values derived from the log. "
+                "Review the report first, as very old direct edits can't be told "
+                "apart from stars spent from the pool."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="The number of worker processes. Use 1 to run in this process.",
+        )
+        parser.add_argument(
+            "--partition-size",
+            type=int,
+            default=1000,
+            help="The number of user IDs checked per query.",
+        )
+
+    def handle(self, *args, **options):
+        bounds = User.objects.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            self.stdout.write("There are no users to check")
+            return
+
+        size = options["partition_size"]
+        partitions = [
+            (start, min(start + size - 1, bounds["last"]))
+            for start in range(bounds["first"], bounds["last"] + 1, size)
+        ]
+
+        if options["workers"] == 1:
+            results = (
+                reconcile_range(*partition, repair=options["repair"])
+                for partition in partitions
+            )
+            self.report(results, len(partitions))
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(reconcile_range, *partition, repair=options["repair"])
+                for partition in partitions
+            ]
+            self.report(
+                (future.result() for future in as_completed(futures)), len(partitions)
+            )
+
+    def report(self, results, total):
+        """
+        Print the drifted balances and the progress as the partitions are
+        being checked.
+
+        """
+
+        checked = 0
+        drifted = 0
+        repaired = 0
+        for done, (users, drift) in enumerate(results, 1):
+            checked += users
+            for d in drift:
+                drifted += 1
+                repaired += d.repaired
+
+                account = d.username
+                if d.character_id is not None:
+                    account += f" / {d.character_name} (#{d.character_id})"
+                status = " (repaired)" if d.repaired else ""
+                self.stdout.write(
+                    f"{account}: {d.actual} stars, expected {d.expected}{status}"
+                )
+
+            self.stderr.write(
+                f"Checked {done}/{total} partitions ({checked} users)", ending="\r"
+            )
+            self.stderr.flush()
+
+        self.stderr.write("")
+        self.stdout.write(
+            f"Checked {checked} users, found {drifted} drifted balances, "
+            f"repaired {repaired}"
+        )
@@ -0,0 +1,213 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ... import ledger
+from ...models import Character, LogEntry, LogType, User
+
+# Generated users get usernames starting with this prefix so they can easily be
+# told apart from real users and removed again
+USERNAME_PREFIX = "loadtest-"
+
+# The number of rows to insert per query
+BATCH_SIZE = 1000
+
+REASONS = [None, "Quest reward", "Downtime", "Art", "DM'ing a session"]
+
+
+def simulate_history(num_characters, num_logs, start, end):
+    """
+    Generate a plausible history for a single user. Stars get added to the pool
+    and spent on characters in such a way that no balance ever drops below
+    zero, so the final balances match what replaying the log would produce.
+
+    Parameters
+    ----------
+    num_characters : int
+        The number of characters to create.
+    num_logs : int
+        The total number of log entries, including the entries for adding the
+        characters.
+    start, end : datetime
+        The period the log entries should be spread over.
+
+    Returns
+    -------
+    unspent_stars : int
+        The user's final pool of unspent stars.
+    characters : list of dict
+        The characters' final fields.
+    entries : list of dict
+        The log entries' fields, with `character` being an index into
+        `characters`.
+
+    """
+
+    characters = [
+        {
+            "name": f"Character {i + 1}",
+            "stars": 0,
+            "dead": random.random() < 0.1,
+            "iron_man": random.random() < 0.1,
+        }
+        for i in range(num_characters)
+    ]
+    entries = [
+        {"type": LogType.CHARACTER_ADDED, "character": i, "amount": 0}
+        for i in range(num_characters)
+    ]
+
+    unspent_stars = 0
+    while len(entries) < num_logs:
+        roll = random.random()
+        amount = random.randint(1, 5)
+        if roll < 0.5 or not characters:
+            unspent_stars += amount
+            entries.append(
+                {
+                    "type": LogType.STARS_ADDED,
+                    "amount": amount,
+                    "reason": random.choice(REASONS),
+                }
+            )
+            continue
+
+        character = random.randrange(len(characters))
+        if roll < 0.9:
+            amount = min(amount, unspent_stars)
+            if amount == 0:
+                continue
+
+            unspent_stars -= amount
+            direct = False
+        else:
+            # Direct edits can also remove stars from a character
+            amount = random.randint(-characters[character]["stars"], amount)
+            if amount == 0:
+                continue
+
+            direct = True
+
+        characters[character]["stars"] += amount
+        entries.append(
+            {
+                "type": LogType.STARS_SPENT,
+                "character": character,
+                "amount": amount,
+                "reason": random.choice(REASONS),
+                "direct": direct,
+            }
+        )
+
+    # Spread the entries over the period while keeping them in order
+    timestamps = sorted(
+        start + (end - start) * random.random() for _ in range(len(entries))
+    )
+    for entry, created_at in zip(entries, timestamps):
+        entry["created_at"] = created_at
+
+    return unspent_stars, characters, entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users with characters and log entries for load testing. The "
+        f"users are named '{USERNAME_PREFIX}<n>' and can't log in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=10, help="The number of users to create."
+        )
+        parser.add_argument(
+            "--characters",
+            type=int,
+            default=10,
+            help="The number of characters per user.",
+        )
+        parser.add_argument(
+            "--logs",
+            type=int,
+            default=1000,
+            help="The number of log entries per user.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="The number of days the log entries should be spread over.",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="A seed for the random number generator."
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Remove all previously generated users first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+
+        if options["clear"]:
+            deleted = User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).delete()[1]
+            self.stdout.write(f"Removed {deleted.get('exptracker.User', 0)} users")
+
+        # Continue numbering after any existing generated users
+        offset = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        end = timezone.now()
+        start = end - timedelta(days=options["days"])
+
+        for i in range(options["users"]):
+            username = f"{USERNAME_PREFIX}{offset + i + 1}"
+            unspent_stars, characters, entries = simulate_history(
+                options["characters"], options["logs"], start, end
+            )
+
+            with transaction.atomic():
+                self.create_user(username, unspent_stars, characters, entries)
+
+            self.stdout.write(
+                f"Created {username} with {len(characters)} characters and "
+                f"{len(entries)} log entries"
+            )
+
+    def create_user(self, username, unspent_stars, characters, entries):
+        user = User(username=username, unspent_stars=unspent_stars)
+        user.set_unusable_password()
+        user.save()
+
+        # Not every database backend returns primary keys from bulk inserts, so
+        # the characters are fetched again afterwards
+        Character.objects.bulk_create(
+            (Character(user=user, **fields) for fields in characters),
+            batch_size=BATCH_SIZE,
+        )
+        character_objects = list(user.characters.order_by("id"))
+
+        logs = []
+        for fields in entries:
+            fields = fields.copy()
+            character_index = fields.pop("character", None)
+            if character_index is not None:
+                character = character_objects[character_index]
+                fields["character"] = character
+                if fields["type"] == LogType.CHARACTER_ADDED:
+                    fields["character_snapshot"] = {
+                        "id": character.id,
+                        "name": character.name,
+                        "stars": 0,
+                        "dead": character.dead,
+                        "iron_man": character.iron_man,
+                    }
+
+            logs.append(LogEntry(user=user, **fields))
+
+        LogEntry.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+        ledger.rebuild_checkpoints(user)
@@ -0,0 +1,135 @@
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .caching import get_cached_user, set_cached_user
+from .stats import registry
+
+# Turns the named groups in regular expression URL patterns into `<name>`
+NAMED_GROUP_RE = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+class QueryCounter:
+    """
+    A database execute wrapper that counts the number of executed queries and
+    the total time spent on them.
+
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.queries += 1
+
+
+def endpoint_name(request):
+    """
+    Identify the endpoint a request was routed to by its method and URL
+    pattern, for instance `GET /api/characters/<pk>/`.
+
+    """
+
+    route = NAMED_GROUP_RE.sub(r"<\1>", request.resolver_match.route)
+    route = route.lstrip("^").rstrip("$")
+
+    return f"{request.method} /{route}"
+
+
+class QueryStatsMiddleware:
+    """
+    Record the number of SQL queries, the time spent on those queries and the
+    total time spent handling the request for every API request. See
+    `exptracker.stats` for more information.
+
+    This should be placed near the top of the middleware list so the queries
+    made by the session and authentication middleware are counted as well.
+    Queries made while iterating over streaming responses are not counted.
+
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+
+            response = self.get_response(request)
+
+        wall_time = time.perf_counter() - start
+        if request.resolver_match is not None and request.path.startswith("/api/"):
+            registry.record(
+                endpoint_name(request), counter.queries, counter.time, wall_time
+            )
+
+        return response
+
+
+def _get_user(request):
+    """
+    A cached version of `django.contrib.auth.get_user()`. The cached user is
+    only used if the session would also have been accepted by Django, and only
+    if all workers share the same cache.
+
+    """
+
+    if not settings.SHARED_CACHE:
+        return auth.get_user(request)
+
+    try:
+        user_id = request.session[auth.SESSION_KEY]
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+
+    user = get_cached_user(user_id)
+    if user is not None and backend_path in settings.AUTHENTICATION_BACKENDS:
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash()
+        ):
+            return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        set_cached_user(user)
+
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    A drop-in replacement for Django's `AuthenticationMiddleware` that caches
+    the logged in user for a short while, saving a query on every request. The
+    user gets removed from the cache whenever it's modified, see
+    `exptracker.caching`.
+
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+
+        def get_user():
+            if not hasattr(request, "_cached_user"):
+                request._cached_user = _get_user(request)
+
+            return request._cached_user
+
+        request.user = SimpleLazyObject(get_user)
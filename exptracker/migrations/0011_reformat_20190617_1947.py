@@ -1,5 +1,6 @@
 from django.db import migrations
 
+from ..chunking import bulk_update_in_chunks
 from ..models import LogType
 
 
@@ -11,18 +12,22 @@ def fix_star_spend_logs(apps, schema_editor):
     """
     LogEntry = apps.get_model("exptracker", "LogEntry")
 
-    incorrect_entries = LogEntry.objects.filter(type=LogType.STARS_SPENT).exclude(
-        value__has_key="amount"
-    )
-    for entry in incorrect_entries:
+    def reformat(entry):
         assert type(entry.value) == int
 
         # F-expressions don't work in combination with JSONField
         entry.value = {"amount": entry.value, "reason": None}
-        entry.save()
+
+    incorrect_entries = LogEntry.objects.filter(type=LogType.STARS_SPENT).exclude(
+        value__has_key="amount"
+    )
+    bulk_update_in_chunks(incorrect_entries, ["value"], reformat)
 
 
 class Migration(migrations.Migration):
+    # Every chunk is committed separately
+    atomic = False
+
     dependencies = [("exptracker", "0010_character_dead")]
 
     operations = [migrations.RunPython(fix_star_spend_logs)]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0012_character_iron_man'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='logentry_user_created_idx'),
+        ),
+    ]
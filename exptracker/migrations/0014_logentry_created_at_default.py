@@ -0,0 +1,19 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0013_logentry_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logentry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
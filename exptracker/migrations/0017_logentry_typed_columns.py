@@ -0,0 +1,38 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:34
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0016_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logentry',
+            name='amount',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='character_snapshot',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='direct',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='reason',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['user', 'type'], name='logentry_user_type_idx'),
+        ),
+    ]
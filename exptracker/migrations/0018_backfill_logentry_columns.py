@@ -0,0 +1,47 @@
+from django.db import migrations
+
+from ..chunking import bulk_update_in_chunks
+from ..models import LogType
+
+
+def move_value(entry):
+    if entry.type in {str(LogType.STARS_ADDED), str(LogType.STARS_SPENT)}:
+        # Some very early entries stored the amount under `stars`
+        entry.amount = entry.value.get("amount", entry.value.get("stars"))
+        entry.reason = entry.value.get("reason")
+        entry.direct = bool(entry.value.get("direct"))
+    else:
+        entry.character_snapshot = entry.value
+        if entry.type == str(LogType.CHARACTER_ADDED):
+            entry.amount = entry.value.get("stars")
+
+
+def backfill_typed_columns(apps, schema_editor):
+    """
+    Move the contents of the old `value` JSON column into the new typed
+    columns.
+
+    This runs in separate transactions per chunk of primary keys, so the table
+    is never locked for long. Entries that have already been migrated are
+    skipped, so this can safely be resumed after being interrupted.
+
+    """
+    LogEntry = apps.get_model("exptracker", "LogEntry")
+
+    pending = LogEntry.objects.filter(
+        amount__isnull=True, character_snapshot__isnull=True, value__isnull=False
+    )
+    bulk_update_in_chunks(
+        pending, ["amount", "reason", "direct", "character_snapshot"], move_value
+    )
+
+
+class Migration(migrations.Migration):
+    # Every chunk is committed separately
+    atomic = False
+
+    dependencies = [("exptracker", "0017_logentry_typed_columns")]
+
+    operations = [
+        migrations.RunPython(backfill_typed_columns, migrations.RunPython.noop)
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0018_backfill_logentry_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['-created_at', '-id'], name='logentry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['type', '-created_at', '-id'], name='logentry_type_created_idx'),
+        ),
+    ]
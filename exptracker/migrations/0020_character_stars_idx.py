@@ -0,0 +1,17 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0019_logentry_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['-stars'], name='character_stars_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0020_character_stars_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['user', 'dead', '-stars'], name='character_user_dead_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(condition=models.Q(dead=False), fields=['user', '-stars'], name='character_living_idx'),
+        ),
+    ]
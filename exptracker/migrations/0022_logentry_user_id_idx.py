@@ -0,0 +1,17 @@
+# Generated by Django 2.2.20 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exptracker', '0021_character_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['user', 'id'], name='logentry_user_id_idx'),
+        ),
+    ]
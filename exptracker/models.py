@@ -3,9 +3,89 @@ from enum import Enum
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import JSONField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.db.models.functions import Mod
+from django.utils import timezone
 
-from .utils import stars_to_level
+from .caching import invalidate_cached_user, invalidate_campaign
+from .utils import LEVELS, STARS_FOR_LEVEL, STARS_PER_BANNER, stars_to_level
+
+
+def _adjust_balance(instance, field_name, delta, counter_name=None):
+    """
+    Atomically add `delta` to a non-negative integer column in a single
+    conditional `UPDATE` statement. This neither needs the current value nor
+    holds a row lock while running Python code, so concurrent requests can't
+    overdraw the balance.
+
+    Parameters
+    ----------
+    instance : Model
+        The model instance to update. The new value will be written back to
+        this object.
+    field_name : str
+        The name of the field to update.
+    delta : int
+        The amount to add, can be negative.
+    counter_name : str, optional
+        The name of a counter field to increment in the same statement, such as
+        `User.data_version`. This is only incremented if the update succeeds.
+
+    Returns
+    -------
+    bool
+        Whether the update succeeded. This will return `False` if the update
+        would have made the value negative, in which case nothing will have
+        changed.
+
+    """
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(instance._meta.db_table)
+    column = quote_name(instance._meta.get_field(field_name).column)
+    pk_column = quote_name(instance._meta.pk.column)
+
+    fields = [field_name]
+    assignments = f"{column} = {column} + %s"
+    returning = column
+    if counter_name is not None:
+        counter_column = quote_name(instance._meta.get_field(counter_name).column)
+        fields.append(counter_name)
+        assignments += f", {counter_column} = {counter_column} + 1"
+        returning += f", {counter_column}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {assignments} "
+            f"WHERE {pk_column} = %s AND {column} + %s >= 0 "
+            f"RETURNING {returning}",
+            [delta, instance.pk, delta],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        return False
+
+    for name, value in zip(fields, row):
+        setattr(instance, name, value)
+    return True
+
+
+def _invalidate_user(user_id):
+    """
+    Remove a user and the campaign overview from the cache once the current
+    transaction has been committed. Removing them any earlier would
+    allow a concurrent request to cache the old committed values again.
+
+    """
+
+    def invalidate():
+        invalidate_cached_user(user_id)
+        invalidate_campaign()
+
+    transaction.on_commit(invalidate)
 
 
 class User(AbstractUser):
@@ -17,10 +97,133 @@ class User(AbstractUser):
     unspent_stars : int
         The number of stars that the player can still distribute amongst his
         or her characters.
+    data_version : int
+        A counter that gets incremented whenever any of the user's data
+        changes. This is used to generate ETags so clients can cheaply check
+        whether their copy of the data is still up to date.
 
     """
 
     unspent_stars = models.PositiveIntegerField(default=0)
+    data_version = models.PositiveIntegerField(default=0)
+
+    def bump_data_version(self):
+        """
+        Mark the user's characters and information as modified. This should be
+        called from every code path that modifies a user's characters or star
+        pool.
+
+        """
+
+        User.objects.filter(pk=self.pk).update(data_version=F("data_version") + 1)
+        _invalidate_user(self.pk)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        _invalidate_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        _invalidate_user(self.pk)
+        return super().delete(*args, **kwargs)
+
+    def adjust_unspent_stars(self, delta):
+        """
+        Add stars to or remove stars from the pool of unspent stars, see
+        `_adjust_balance()`. `self.unspent_stars` will contain the new balance
+        afterwards. This also increments the data version in the same
+        statement, so there's no need to call `bump_data_version()` after
+        adjusting the pool.
+
+        """
+
+        adjusted = _adjust_balance(self, "unspent_stars", delta, "data_version")
+        if adjusted:
+            _invalidate_user(self.pk)
+
+        return adjusted
+
+
+def _level_case(values):
+    """
+    Build a `CASE` expression mapping a character's stars to the value for the
+    character's current level, using the same leveling table as
+    `stars_to_level()`.
+
+    """
+
+    return Case(
+        *(
+            When(stars__gte=STARS_FOR_LEVEL[level], then=Value(values[level]))
+            for level in reversed(LEVELS)
+        ),
+        output_field=IntegerField(),
+    )
+
+
+class CharacterQuerySet(models.QuerySet):
+    def with_progression(self):
+        """
+        Annotate every character with its progression, calculated by the
+        database. The annotated values will always match `stars_to_level()`,
+        and they can be used for filtering and ordering.
+
+        Returns
+        -------
+        QuerySet
+            This queryset with the following annotations added:
+
+            - `progression_level`, the character's level
+            - `progression_banners`, the number of banners towards the next
+              level
+            - `progression_stars`, the number of stars towards the next banner
+
+        """
+
+        level_cost = _level_case(STARS_FOR_LEVEL)
+        banner_cost = _level_case(STARS_PER_BANNER)
+        # The stars column is unsigned, so we need to be explicit about the type
+        # of the result
+        level_stars = ExpressionWrapper(
+            F("stars") - level_cost, output_field=IntegerField()
+        )
+
+        return self.annotate(
+            progression_level=_level_case({level: level for level in LEVELS}),
+            # Both sides are integers, so this will be an integer division
+            progression_banners=ExpressionWrapper(
+                level_stars / banner_cost, output_field=IntegerField()
+            ),
+            progression_stars=Mod(
+                level_stars, banner_cost, output_field=IntegerField()
+            ),
+        )
+
+    def filter_level(self, min_level=None, max_level=None):
+        """
+        Only include characters within a range of levels. This gives the same
+        results as filtering on `progression_level` from `with_progression()`,
+        but since a character's level only depends on its number of stars,
+        this filters on the stars column directly so the query can use an
+        index.
+
+        Parameters
+        ----------
+        min_level, max_level : int, optional
+            The inclusive bounds of the range.
+
+        """
+
+        queryset = self
+        if min_level is not None and min_level > LEVELS[0]:
+            if min_level > LEVELS[-1]:
+                return queryset.none()
+            queryset = queryset.filter(stars__gte=STARS_FOR_LEVEL[min_level])
+        if max_level is not None and max_level < LEVELS[-1]:
+            if max_level < LEVELS[0]:
+                return queryset.none()
+            queryset = queryset.filter(stars__lt=STARS_FOR_LEVEL[max_level + 1])
+
+        return queryset
 
 
 class Character(models.Model):
@@ -49,6 +252,37 @@ class Character(models.Model):
     dead = models.BooleanField(default=False)
     iron_man = models.BooleanField(default=False)
 
+    objects = CharacterQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Used for ranking characters across all users
+            models.Index(fields=["-stars"], name="character_stars_idx"),
+            # Used for filtering and sorting a user's characters
+            models.Index(
+                fields=["user", "dead", "-stars"], name="character_user_dead_idx"
+            ),
+            # Most requests only care about living characters
+            models.Index(
+                fields=["user", "-stars"],
+                name="character_living_idx",
+                condition=Q(dead=False),
+            ),
+        ]
+
+    def adjust_stars(self, delta):
+        """
+        Add stars to or remove stars from this character, see
+        `_adjust_balance()`. `self.stars` will contain the new number of stars
+        afterwards.
+
+        """
+
+        return _adjust_balance(self, "stars", delta)
+
+    def __str__(self):
+        return self.name
+
     @property
     def level(self):
         return stars_to_level(self.stars)[0]
@@ -82,7 +316,9 @@ class LogType(Enum):
     CHARACTER_ADDED = "CHARACTER_ADDED"
     CHARACTER_DELETED = "CHARACTER_DELETED"
     STARS_ADDED = "STARS_ADDED"
-    # Stars spent on a character from the pool of unspent stars.
+    # Stars spent on a character from the pool of unspent stars. This is also
+    # used when editing a character's stars directly, in which case `direct`
+    # will be set since the pool is left untouched.
     STARS_SPENT = "STARS_SPENT"
 
 
@@ -90,9 +326,27 @@ class LogEntry(models.Model):
     """
     A log storing all changes made by a player.
 
-    This is mostly useful for later reference. The value column right now only
-    stores integers or NULL values, but we'll store it as JSON in the database
-    to make it slightly easier to work with.
+    This is mostly useful for later reference. The API still represents the
+    entry's data as a single JSON value, see `LogSerializer`.
+
+    Attributes
+    ----------
+    amount : int
+        The number of stars added or spent for `STARS_ADDED` and `STARS_SPENT`
+        entries, and the character's initial number of stars for
+        `CHARACTER_ADDED` entries.
+    reason : str
+        The optional reason for a `STARS_ADDED` or `STARS_SPENT` entry.
+    direct : bool
+        Whether the stars of a `STARS_SPENT` entry were added to the character
+        directly instead of being spent from the pool.
+    character_snapshot : dict
+        The serialized character for `CHARACTER_ADDED` and `CHARACTER_DELETED`
+        entries.
+    value : dict
+        The old JSON representation of the above fields. This is no longer
+        written to and only kept until all existing entries have been
+        migrated, see migration 0018.
 
     """
 
@@ -104,9 +358,33 @@ class LogEntry(models.Model):
     type = models.CharField(
         max_length=32, choices=((str(tag), tag.value) for tag in LogType)
     )
+    amount = models.IntegerField(blank=True, null=True)
+    reason = models.TextField(blank=True, null=True)
+    direct = models.BooleanField(default=False)
+    character_snapshot = JSONField(blank=True, null=True)
     value = JSONField(blank=True, null=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # This is not an `auto_now_add` field so imported history can keep its
+    # original timestamps
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Used for paginating through a user's log, newest entries first
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="logentry_user_created_idx"
+            ),
+            # Used for fetching the entries added after the last synchronization
+            models.Index(fields=["user", "id"], name="logentry_user_id_idx"),
+            # Used for aggregating a single type of log entry
+            models.Index(fields=["user", "type"], name="logentry_user_type_idx"),
+            # Used for browsing all users' logs in the admin, optionally
+            # filtered by type
+            models.Index(fields=["-created_at", "-id"], name="logentry_created_idx"),
+            models.Index(
+                fields=["type", "-created_at", "-id"], name="logentry_type_created_idx"
+            ),
+        ]
 
     def clean(self):
         if self.type in {
@@ -117,14 +395,100 @@ class LogEntry(models.Model):
             if self.character_id is None:
                 raise ValidationError({"character": "Missing character."})
 
-        # Verify that the type of `self.value` matches the log entry's type
-        if self.type in {
-            LogType.STARS_SPENT,
-            LogType.STARS_ADDED,
-            LogType.CHARACTER_ADDED,
-            LogType.CHARACTER_DELETED,
-        }:
-            if type(self.value) != dict:
+        # Verify that the entry's data matches the log entry's type
+        if self.type in {LogType.STARS_SPENT, LogType.STARS_ADDED}:
+            if self.amount is None:
+                raise ValidationError({"amount": "Missing amount."})
+        if self.type in {LogType.CHARACTER_ADDED, LogType.CHARACTER_DELETED}:
+            if type(self.character_snapshot) != dict:
                 raise ValidationError(
-                    {"value": "Incorrect value type, expected 'dict'."}
+                    {
+                        "character_snapshot": (
+                            "Incorrect character snapshot type, expected 'dict'."
+                        )
+                    }
                 )
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    A snapshot of a balance as derived from the log, used to answer historical
+    balance queries without having to replay a user's entire log. See
+    `exptracker.ledger`.
+
+    Attributes
+    ----------
+    character : Character
+        The character whose number of stars this is, or `None` if this is a
+        checkpoint for the user's pool of unspent stars.
+    log_entry : LogEntry
+        The last log entry included in this checkpoint.
+    created_at : datetime
+        The creation time of `log_entry`, used to find the nearest checkpoint
+        for some point in time.
+    balance : int
+        The number of stars after applying `log_entry`.
+
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="checkpoints")
+    character = models.ForeignKey(
+        Character,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="checkpoints",
+    )
+    log_entry = models.ForeignKey(LogEntry, on_delete=models.CASCADE, related_name="+")
+
+    created_at = models.DateTimeField()
+    balance = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "character", "-created_at"],
+                name="checkpoint_account_idx",
+            )
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response for a request made with an `Idempotency-Key` header,
+    see `exptracker.api.idempotency`. These are written in the same transaction
+    as the changes made by the request.
+
+    Attributes
+    ----------
+    key : str
+        The key sent by the client. Keys are unique per user.
+    fingerprint : str
+        A hash of the request's method, path and contents, used to detect keys
+        being reused for different requests.
+    status : int
+        The response's status code.
+    response : dict
+        The response's data.
+
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+
+    status = models.PositiveSmallIntegerField()
+    response = JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotencykey_user_key_unique"
+            )
+        ]
+        indexes = [
+            # Used for removing expired keys
+            models.Index(fields=["created_at"], name="idempotencykey_created_idx")
+        ]
@@ -0,0 +1,191 @@
+"""
+Applying multiple changes to a user's stars and characters at once.
+
+A batch is an ordered list of operations. Every operation is a dict with an
+`op` key and the fields listed for that operation in `OPERATION_FIELDS`:
+
+- `adjust`: add `stars` to the pool of unspent stars, with an optional
+  `reason`. The same as `POST /api/user/adjust/`.
+- `spend`: move `stars` from the pool to a `character`. The same as
+  `POST /api/characters/<id>/spend/`.
+- `set_stars`: set a `character`'s number of stars directly, with an optional
+  `reason`. The same as changing the stars through
+  `PATCH /api/characters/<id>/`.
+- `rename`: change a `character`'s `name`.
+- `set_dead`: change whether a `character` is `dead`.
+
+Operations are validated and applied in order, so later operations see the
+results of earlier ones. The whole batch happens in a single transaction with a
+single bulk update for the characters and a single bulk insert for the log
+entries. If any operation is invalid nothing will have been changed.
+
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger
+from .models import Character, LogEntry, LogType, User
+
+# The fields required by every type of operation
+OPERATION_FIELDS = {
+    "adjust": ("stars",),
+    "spend": ("character", "stars"),
+    "set_stars": ("character", "stars"),
+    "rename": ("character", "name"),
+    "set_dead": ("character", "dead"),
+}
+
+# The maximum number of operations in a single batch
+MAX_OPERATIONS = 100
+
+
+class InvalidOperationError(Exception):
+    """
+    Raised when an operation in a batch is invalid or would result in a
+    negative balance. Nothing will have been changed when this is raised.
+
+    """
+
+    def __init__(self, message, index=None):
+        if index is not None:
+            message = f"Operation {index + 1}: {message}"
+
+        super().__init__(message)
+
+
+def apply_operations(user, operations):
+    """
+    Apply a batch of operations for a user.
+
+    Parameters
+    ----------
+    user : User
+        The user whose data should be modified.
+    operations : list of dict
+        The operations, see the module's documentation.
+
+    Returns
+    -------
+    user : User
+        A fresh copy of the user with the new number of unspent stars.
+    characters : list of Character
+        The characters that were modified.
+    pool_delta : int
+        The change in the user's number of unspent stars.
+
+    Raises
+    ------
+    InvalidOperationError
+        When any of the operations is invalid. The transaction will be rolled
+        back in that case.
+
+    """
+
+    with transaction.atomic():
+        user = User.objects.select_for_update().get(pk=user.pk)
+        characters = user.characters.select_for_update().in_bulk(
+            {op["character"] for op in operations if "character" in op}
+        )
+        now = timezone.now()
+        initial_unspent_stars = user.unspent_stars
+
+        modified = {}
+        logs = []
+        for index, op in enumerate(operations):
+            character = None
+            if "character" in op:
+                character = characters.get(op["character"])
+                if character is None:
+                    raise InvalidOperationError(
+                        f"Unknown character {op['character']}.", index
+                    )
+
+                modified[character.pk] = character
+
+            if op["op"] == "adjust":
+                user.unspent_stars += op["stars"]
+                if user.unspent_stars < 0:
+                    raise InvalidOperationError(
+                        "You can't have a negative number of stars. That would be "
+                        "silly.",
+                        index,
+                    )
+
+                logs.append(
+                    LogEntry(
+                        user=user,
+                        type=LogType.STARS_ADDED,
+                        amount=op["stars"],
+                        reason=op.get("reason"),
+                        created_at=now,
+                    )
+                )
+            elif op["op"] == "spend":
+                if op["stars"] == 0:
+                    raise InvalidOperationError(
+                        "The number of stars spent must be non-zero.", index
+                    )
+
+                user.unspent_stars -= op["stars"]
+                character.stars += op["stars"]
+                if user.unspent_stars < 0:
+                    raise InvalidOperationError(
+                        "You do not have enough stars to buy this banner.", index
+                    )
+                if character.stars < 0:
+                    raise InvalidOperationError(
+                        "Your character can't have a negative number of stars.", index
+                    )
+
+                logs.append(
+                    LogEntry(
+                        user=user,
+                        character=character,
+                        type=LogType.STARS_SPENT,
+                        amount=op["stars"],
+                        created_at=now,
+                    )
+                )
+            elif op["op"] == "set_stars":
+                if op["stars"] < 0:
+                    raise InvalidOperationError(
+                        "Your character can't have a negative number of stars.", index
+                    )
+
+                delta = op["stars"] - character.stars
+                character.stars = op["stars"]
+                if delta != 0:
+                    logs.append(
+                        LogEntry(
+                            user=user,
+                            character=character,
+                            type=LogType.STARS_SPENT,
+                            amount=delta,
+                            reason=op.get("reason"),
+                            # These stars don't come from the pool
+                            direct=True,
+                            created_at=now,
+                        )
+                    )
+            elif op["op"] == "rename":
+                character.name = op["name"]
+            elif op["op"] == "set_dead":
+                character.dead = op["dead"]
+            else:
+                raise InvalidOperationError(f"Unknown operation '{op['op']}'.", index)
+
+        Character.objects.bulk_update(modified.values(), ["name", "stars", "dead"])
+        LogEntry.objects.bulk_create(logs)
+        user.data_version += 1
+        user.save(update_fields=["unspent_stars", "data_version"])
+
+        # The new entries are the newest in their accounts, so the checkpoints
+        # can simply be extended
+        if any(entry.character_id is None or not entry.direct for entry in logs):
+            ledger.update_checkpoints(user)
+        for character_id in {entry.character_id for entry in logs}:
+            if character_id is not None:
+                ledger.update_checkpoints(user, characters[character_id])
+
+    return user, list(modified.values()), user.unspent_stars - initial_unspent_stars
@@ -0,0 +1,174 @@
+"""
+Verifying the denormalized balances against the log.
+
+Both `User.unspent_stars` and `Character.stars` should always equal the sum of
+the relevant log entries, see `ledger.pool_delta()` and
+`ledger.character_delta()`. The functions in this module compute those sums
+with a single aggregating query per range of users instead of replaying the log
+in Python, so they can be run over the entire database.
+
+Stars spent through direct edits made before log entries had a `direct` flag
+are indistinguishable from stars spent from the pool. Users with such entries
+will show up with a drifted pool even though their balance is correct, so
+drift should be reviewed before repairing it.
+
+"""
+
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .caching import invalidate_cached_user
+from .models import Character, LogType, User
+
+# A balance that doesn't match the log. `character_id` and `character_name` are
+# `None` for a user's pool of unspent stars.
+Drift = namedtuple(
+    "Drift",
+    [
+        "user_id",
+        "username",
+        "character_id",
+        "character_name",
+        "actual",
+        "expected",
+        "repaired",
+    ],
+)
+
+
+def _expected_pool():
+    added = Sum("logs__amount", filter=Q(logs__type=LogType.STARS_ADDED))
+    spent = Sum(
+        "logs__amount", filter=Q(logs__type=LogType.STARS_SPENT, logs__direct=False)
+    )
+
+    return Coalesce(added, 0) - Coalesce(spent, 0)
+
+
+def _expected_stars():
+    return Coalesce(
+        Sum(
+            "logs__amount",
+            filter=Q(logs__type__in=[LogType.CHARACTER_ADDED, LogType.STARS_SPENT]),
+        ),
+        0,
+    )
+
+
+def find_drift(users):
+    """
+    Compare the balances of a set of users and their characters to the log.
+
+    Parameters
+    ----------
+    users : QuerySet
+        The users to check.
+
+    Returns
+    -------
+    list of Drift
+        The balances that don't match the log.
+
+    """
+
+    pools = (
+        users.annotate(expected=_expected_pool())
+        .exclude(unspent_stars=F("expected"))
+        .values_list("id", "username", "unspent_stars", "expected")
+    )
+    characters = (
+        Character.objects.filter(user__in=users)
+        .annotate(expected=_expected_stars())
+        .exclude(stars=F("expected"))
+        .values_list("user_id", "user__username", "id", "name", "stars", "expected")
+    )
+
+    drift = [
+        Drift(user_id, username, None, None, actual, expected, False)
+        for user_id, username, actual, expected in pools
+    ]
+    drift += [Drift(*fields, False) for fields in characters]
+
+    return drift
+
+
+def repair_drift(user_ids):
+    """
+    Overwrite the balances of a set of users and their characters with the
+    values derived from the log. The users and their characters are locked
+    while doing so, so concurrent requests can't modify them in between
+    calculating and writing the new balances. Negative balances can't be
+    stored, so those are left untouched.
+
+    Returns
+    -------
+    list of Drift
+        The balances that didn't match the log, with `repaired` set for the
+        balances that have been overwritten.
+
+    """
+
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk__in=user_ids).values("pk"))
+        list(
+            Character.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .values("pk")
+        )
+
+        drift = [
+            d._replace(repaired=d.expected >= 0)
+            for d in find_drift(User.objects.filter(pk__in=user_ids))
+        ]
+        User.objects.bulk_update(
+            [
+                User(pk=d.user_id, unspent_stars=d.expected)
+                for d in drift
+                if d.repaired and d.character_id is None
+            ],
+            ["unspent_stars"],
+        )
+        Character.objects.bulk_update(
+            [
+                Character(pk=d.character_id, stars=d.expected)
+                for d in drift
+                if d.repaired and d.character_id is not None
+            ],
+            ["stars"],
+        )
+
+        repaired_users = {d.user_id for d in drift if d.repaired}
+        User.objects.filter(pk__in=repaired_users).update(
+            data_version=F("data_version") + 1
+        )
+
+    for user_id in repaired_users:
+        invalidate_cached_user(user_id)
+
+    return drift
+
+
+def reconcile_range(first_id, last_id, repair=False):
+    """
+    Check, and optionally repair, the balances of the users with primary keys
+    in `[first_id, last_id]`. This is meant to be run in a worker process, see
+    the `reconcile_stars` management command.
+
+    Returns
+    -------
+    checked : int
+        The number of users in the range.
+    drift : list of Drift
+        The balances that don't match the log.
+
+    """
+
+    users = User.objects.filter(pk__gte=first_id, pk__lte=last_id)
+    drift = find_drift(users)
+    if repair and drift:
+        drift = repair_drift({d.user_id for d in drift})
+
+    return users.count(), drift
@@ -0,0 +1,96 @@
+"""
+Faster drop-in replacements for Django REST Framework's JSON renderer and
+parser.
+
+Encoding large responses such as the user's logs with the standard library's
+`json` module takes up most of the time spent on those requests. The classes in
+this module use [orjson](https://github.com/ijl/orjson) instead, which is
+included in the Pipfile. Environments without orjson fall back to behaving
+exactly like DRF's own `JSONRenderer` and `JSONParser`. Use the `benchmark_json`
+management command to compare both implementations.
+
+The rendered output is byte-for-byte identical to that of `JSONRenderer` for
+everything our API returns. Datetimes, dates, times, decimals, UUIDs and lazy
+strings are passed on to DRF's `JSONEncoder` so they get formatted the same way
+as before, and JSONField values are already plain Python data by the time they
+get rendered. The only documented differences are:
+
+- Non-finite floats are rendered as `null` instead of raising an error.
+- Integers that don't fit in 64 bits raise an error instead of being rendered.
+
+Requests that ask for indented output, such as those made through the browsable
+API, always use the standard library implementation.
+
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _encode_fallback(obj):
+    """
+    Encode the types orjson doesn't handle itself, or handles differently from
+    DRF, using DRF's own encoder.
+
+    """
+
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    A `JSONRenderer` that uses orjson for unindented output when it is
+    available.
+
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_encode_fallback,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+
+        # The same as in `JSONRenderer`, this makes sure the output is a strict
+        # JavaScript subset
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class FastJSONParser(JSONParser):
+    """
+    A `JSONParser` that uses orjson when it is available. Like the default
+    parser in strict mode, this rejects `NaN` and `Infinity`.
+
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,170 @@
+"""
+A small in-process registry of per-endpoint SQL query and latency statistics.
+
+The numbers are collected by `exptracker.middleware.QueryStatsMiddleware` for
+every API request and can be inspected through `/api/_stats/` or the
+`query_stats` management command. Every process keeps its own statistics, so
+with multiple workers every worker will only report on the requests it has
+handled itself.
+
+"""
+
+import math
+import threading
+from collections import Counter, deque
+
+# The number of most recent requests per endpoint used to calculate percentiles
+MAX_SAMPLES = 1000
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    """
+    Calculate a percentile using the nearest-rank method.
+
+    Parameters
+    ----------
+    values : list of float
+        The values, in any order.
+    p : int
+        The percentile, between 0 and 100.
+
+    Returns
+    -------
+    float or None
+        The percentile, or `None` if there are no values.
+
+    """
+
+    if not values:
+        return None
+
+    values = sorted(values)
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+
+    return values[rank - 1]
+
+
+class EndpointStats:
+    """
+    Statistics for a single endpoint.
+
+    Attributes
+    ----------
+    requests : int
+        The total number of recorded requests.
+    max_queries : int
+        The highest number of queries used by any recorded request.
+    samples : deque of (int, float, float)
+        The query count, the total SQL time and the wall time in seconds for the
+        most recent requests.
+
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.max_queries = 0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def record(self, queries, sql_time, wall_time):
+        self.requests += 1
+        self.max_queries = max(self.max_queries, queries)
+        self.samples.append((queries, sql_time, wall_time))
+
+    def summary(self):
+        queries, sql_times, wall_times = zip(*self.samples)
+        summary = {"requests": self.requests, "max_queries": self.max_queries}
+        for p in PERCENTILES:
+            summary[f"queries_p{p}"] = percentile(queries, p)
+        for p in PERCENTILES:
+            summary[f"sql_ms_p{p}"] = percentile(sql_times, p) * 1000
+        for p in PERCENTILES:
+            summary[f"wall_ms_p{p}"] = percentile(wall_times, p) * 1000
+
+        return summary
+
+
+class StatsRegistry:
+    """
+    A thread safe mapping from endpoints to their `EndpointStats`. Endpoints
+    are identified by their HTTP method and URL pattern, for instance
+    `POST /api/characters/<pk>/spend/`.
+
+    This also keeps track of named counters, such as cache hits and misses.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._counters = Counter()
+
+    def record(self, endpoint, queries, sql_time, wall_time):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+
+            stats.record(queries, sql_time, wall_time)
+
+    def summary(self):
+        """
+        Returns
+        -------
+        dict
+            A summary containing the number of requests and the query count,
+            SQL time and wall time percentiles for every endpoint.
+
+        """
+
+        with self._lock:
+            return {
+                endpoint: stats.summary()
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+
+    def increment(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def check_budgets(self, budgets):
+        """
+        Compare the recorded query counts against a query budget. This is
+        meant to be used in tests to catch regressions like accidentally
+        fetching the same object twice.
+
+        Parameters
+        ----------
+        budgets : dict of str to int
+            The maximum number of queries a single request to an endpoint may
+            use.
+
+        Returns
+        -------
+        dict of str to int
+            The endpoints that exceeded their budget along with the highest
+            number of queries used. This will be empty if every endpoint stayed
+            within its budget.
+
+        """
+
+        with self._lock:
+            return {
+                endpoint: self._endpoints[endpoint].max_queries
+                for endpoint, budget in budgets.items()
+                if endpoint in self._endpoints
+                and self._endpoints[endpoint].max_queries > budget
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._counters.clear()
+
+
+registry = StatsRegistry()
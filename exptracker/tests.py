@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .management.commands.benchmark_progression import reference_stars_to_level
+from .models import Character, User
+from .stats import registry
+from .utils import LEVELS, STARS_FOR_LEVEL, stars_to_level, stars_to_level_many
+
+# Convert a range of stars that extends past the highest level, so both the
+# lookup table and the calculations after it are covered
+MAX_STARS = STARS_FOR_LEVEL[LEVELS[-1]] + 200
+
+# The maximum number of queries a single request to an endpoint may use. The
+# tests authenticate without a session, so these don't include the session and
+# user queries.
+QUERY_BUDGETS = {
+    "GET /api/characters/": 1,
+    "POST /api/characters/": 3,
+    "PATCH /api/characters/<pk>/": 4,
+    # Deleting a character also clears the references from its log entries and
+    # removes its checkpoints
+    "DELETE /api/characters/<pk>/": 7,
+}
+
+
+class ProgressionTests(TestCase):
+    def test_stars_to_level_matches_reference(self):
+        expected = [reference_stars_to_level(stars) for stars in range(MAX_STARS)]
+
+        self.assertEqual(
+            [stars_to_level(stars) for stars in range(MAX_STARS)], expected
+        )
+        self.assertEqual(stars_to_level_many(range(MAX_STARS)), expected)
+
+    def test_with_progression_matches_stars_to_level(self):
+        user = User.objects.create(username="player")
+        Character.objects.bulk_create(
+            Character(user=user, name=str(stars), stars=stars)
+            for stars in range(MAX_STARS)
+        )
+
+        characters = Character.objects.with_progression().values_list(
+            "stars", "progression_level", "progression_banners", "progression_stars"
+        )
+        self.assertEqual(len(characters), MAX_STARS)
+        for stars, *progression in characters:
+            self.assertEqual(tuple(progression), stars_to_level(stars), stars)
+
+    def test_filter_level_matches_with_progression(self):
+        user = User.objects.create(username="player")
+        Character.objects.bulk_create(
+            Character(user=user, name=str(stars), stars=stars)
+            for stars in range(MAX_STARS)
+        )
+
+        characters = Character.objects.with_progression()
+        for min_level in [None, 0, *LEVELS, LEVELS[-1] + 1]:
+            for max_level in [None, 0, *LEVELS, LEVELS[-1] + 1]:
+                expected = characters
+                if min_level is not None:
+                    expected = expected.filter(progression_level__gte=min_level)
+                if max_level is not None:
+                    expected = expected.filter(progression_level__lte=max_level)
+
+                self.assertEqual(
+                    set(characters.filter_level(min_level, max_level)),
+                    set(expected),
+                    (min_level, max_level),
+                )
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Make sure the character endpoints don't regress to running more queries
+    than needed, such as by fetching the same object twice. The queries are
+    counted by `QueryStatsMiddleware`.
+
+    """
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+        self.user = User.objects.create(username="player", unspent_stars=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_character(self, **data):
+        response = self.client.post(
+            "/api/characters/", {"name": "Character", "stars": 8, **data}
+        )
+        self.assertEqual(response.status_code, 201)
+
+        return response.data["id"]
+
+    def test_character_endpoints(self):
+        first = self.create_character()
+        second = self.create_character()
+
+        self.assertEqual(self.client.get("/api/characters/").status_code, 200)
+        self.assertEqual(
+            self.client.patch(
+                f"/api/characters/{first}/", {"name": "Renamed"}
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.patch(
+                f"/api/characters/{first}/", {"stars": 16, "reason": "Reward"}
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.delete(f"/api/characters/{second}/").status_code, 204
+        )
+
+        self.assertLessEqual(set(QUERY_BUDGETS), set(registry.summary()))
+        self.assertEqual(registry.check_budgets(QUERY_BUDGETS), {})
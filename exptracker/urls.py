@@ -7,7 +7,15 @@ router = routers.SimpleRouter()
 router.register("characters", api.characters.CharacterViewSet, "characters")
 
 urlpatterns = router.urls + [
+    path("_stats/", api.stats.query_stats),
+    path("batch/", api.batch.apply_batch),
+    path("campaign/", api.campaign.campaign_overview),
+    path("events/", api.events.event_stream),
     path("user/", api.user.UserInfo.as_view()),
     path("user/adjust/", api.user.adjust_stars),
+    path("user/export/", api.export.export_data),
+    path("user/import/", api.user.import_history),
+    path("user/history/", api.user.star_history),
     path("user/logs/", api.user.UserLogs.as_view()),
+    path("user/stats/", api.user.user_stats),
 ]
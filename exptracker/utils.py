@@ -64,6 +64,30 @@ for level, banner_cost in STARS_PER_BANNER.items():
 LEVELS = list(sorted(STARS_FOR_LEVEL.keys()))
 
 
+def _build_progression_table():
+    """
+    Precompute the progression for every number of stars up to the highest
+    level. Everything past that point is level 20, where the banner cost stays
+    constant, so those values can be calculated directly.
+
+    """
+
+    table = []
+    for level in LEVELS[:-1]:
+        banner_cost = STARS_PER_BANNER[level]
+        for stars in range(STARS_FOR_LEVEL[level + 1] - STARS_FOR_LEVEL[level]):
+            table.append((level, stars // banner_cost, stars % banner_cost))
+
+    return tuple(table)
+
+
+# A lookup table containing the result of `stars_to_level()` for every number of
+# stars below `STARS_FOR_LEVEL[20]`, indexed by that number of stars
+PROGRESSION_TABLE = _build_progression_table()
+
+MAX_LEVEL = LEVELS[-1]
+
+
 def stars_to_level(character_stars):
     """
     Convert between stars and level progression.
@@ -86,22 +110,47 @@ def stars_to_level(character_stars):
 
     """
 
-    # We can determine a character's level from the leveling table above and
-    # calculate the rest from there
-    level, level_cost = next(
-        (
-            (level, STARS_FOR_LEVEL[level])
-            for level in reversed(LEVELS)
-            if character_stars >= STARS_FOR_LEVEL[level]
-        ),
-        (0, STARS_FOR_LEVEL[2]),
+    if character_stars < 0:
+        raise ValueError("A character can't have a negative number of stars.")
+
+    # Anything below level 20 can simply be looked up, and there's no more
+    # leveling past that point
+    if character_stars < len(PROGRESSION_TABLE):
+        return PROGRESSION_TABLE[character_stars]
+
+    banners, remaining_stars = divmod(
+        character_stars - STARS_FOR_LEVEL[MAX_LEVEL], STARS_PER_BANNER[MAX_LEVEL]
     )
 
-    banner_cost = STARS_PER_BANNER[level]
-    banners = (character_stars - level_cost) // banner_cost
-    remaining_stars = character_stars - level_cost - (banners * banner_cost)
+    return MAX_LEVEL, banners, remaining_stars
+
+
+def stars_to_level_many(stars):
+    """
+    Convert a whole sequence of star counts to level progressions at once.
+
+    Parameters
+    ----------
+    stars : iterable of int
+        The number of stars for every character.
+
+    Returns
+    -------
+    list of (int, int, int)
+        The `(level, banners, stars)` tuple for every element in `stars`, in
+        the same order. See `stars_to_level()`.
+
+    """
+
+    table = PROGRESSION_TABLE
+    table_size = len(table)
 
-    return level, banners, remaining_stars
+    return [
+        table[character_stars]
+        if 0 <= character_stars < table_size
+        else stars_to_level(character_stars)
+        for character_stars in stars
+    ]
 
 
 def level_to_stars(level):
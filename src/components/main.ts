@@ -32,5 +32,6 @@ export default class Router extends Vue {
     ]);
 
     this.hasLoaded = true;
+    this.$store.dispatch("subscribeToEvents");
   }
 }
@@ -6,7 +6,7 @@ import { mapState } from "vuex";
 import { BDropdown } from "bootstrap-vue";
 import * as _ from "lodash";
 
-import { Character, UserInfo } from "../../store";
+import { BatchOperation, Character, UserInfo } from "../../store";
 import * as utils from "../../utils";
 import CharacterList from "../character-list.vue";
 import HeaderBar from "../header-bar.vue";
@@ -288,41 +288,36 @@ export default class CharacterPage extends Vue {
       this.progress
     );
 
-    // The two reward types don't interact, so we can process them both at the
-    // same time.
-    let rewardPromises = [];
-
+    // Both parts of the reward are applied in a single request
+    const operations: BatchOperation[] = [];
     if (globalStars !== 0) {
-      rewardPromises.push(
-        new Promise(async next => {
-          await this.$store.dispatch("adjustStars", {
-            stars: globalStars,
-            reason: reward.name
-          });
-
-          this.resetAnimations();
-          next();
-        })
-      );
+      operations.push({
+        op: "adjust",
+        stars: globalStars,
+        reason: reward.name
+      });
     }
-
     if (characterBoundStars !== 0) {
-      rewardPromises.push(
-        new Promise(async next => {
-          const oldProgress = _.clone(this.progress);
-          await this.$store.dispatch("setCharacterStars", {
-            ...this.character,
-            stars: this.character.stars + characterBoundStars,
-            reason: reward.name
-          });
-
-          this.handleLevelUp(oldProgress, this.progress);
-          next();
-        })
-      );
+      operations.push({
+        op: "set_stars",
+        character: this.character.id,
+        stars: this.character.stars + characterBoundStars,
+        reason: reward.name
+      });
+    }
+    if (operations.length === 0) {
+      return;
     }
 
-    await Promise.all(rewardPromises);
+    const oldProgress = _.clone(this.progress);
+    await this.$store.dispatch("applyBatch", operations);
+
+    if (globalStars !== 0) {
+      this.resetAnimations();
+    }
+    if (characterBoundStars !== 0) {
+      this.handleLevelUp(oldProgress, this.progress);
+    }
   }
 
   /**
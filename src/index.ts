@@ -52,7 +52,12 @@ if (document.getElementById("app")) {
       vm.$store.commit("finishRequest");
 
       // Show a toast notification when API requests fail. This should only happen
-      // when the player tries to spend too much stars on a character.
+      // when the player tries to spend too much stars on a character. Requests
+      // without a response will be retried, see `sendWrite()` in `store.ts`.
+      if (error.response === undefined) {
+        throw error;
+      }
+
       const data = error.response.data;
       console.log(data);
       if (data.detail !== undefined) {
@@ -11,6 +11,72 @@ Vue.use(Vuex);
 axios.defaults.xsrfHeaderName = "X-CSRFToken";
 axios.defaults.xsrfCookieName = "csrftoken";
 
+/**
+ * A random identifier for this session. This is sent along with every request
+ * so the server won't send our own changes back to us through the event stream
+ * used in the `subscribeToEvents` action.
+ */
+const CLIENT_ID = Math.random()
+  .toString(36)
+  .slice(2);
+axios.defaults.headers.common["X-Client-Id"] = CLIENT_ID;
+
+/**
+ * The number of times a request that modifies the user's data is sent before
+ * giving up, and the delay in milliseconds before the first retry.
+ */
+const MAX_ATTEMPTS = 4;
+const RETRY_DELAY = 500;
+
+let requestCounter = 0;
+
+/**
+ * Send a request that modifies the user's data. Every request gets a unique
+ * idempotency key, so it can safely be retried when the connection drops before
+ * we receive a response. See `exptracker/api/idempotency.py`.
+ */
+async function sendWrite(method: "post" | "patch", url: string, data: any) {
+  requestCounter += 1;
+  const headers = {
+    "Idempotency-Key": `${CLIENT_ID}-${Date.now()}-${requestCounter}`
+  };
+
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await axios.request({ method, url, data, headers });
+    } catch (error) {
+      // We'll only retry if we never received a response. Retries of requests
+      // that did get processed will receive the original response.
+      if (error.response !== undefined || attempt >= MAX_ATTEMPTS) {
+        throw error;
+      }
+
+      await new Promise(resolve => setTimeout(resolve, RETRY_DELAY * attempt));
+    }
+  }
+}
+
+/**
+ * Log entry IDs are assigned when an entry is inserted, but the entry only
+ * becomes visible once its transaction commits. An entry can thus show up after
+ * we've already received entries with higher IDs, for instance when another
+ * request finishes during a long import. To catch those, log synchronization
+ * always requests this many IDs below the high water mark again.
+ */
+const LOG_SYNC_OVERLAP = 1000;
+
+/**
+ * The mutations that can be sent by the server when the user's data gets
+ * modified in another session.
+ */
+const LIVE_MUTATIONS = [
+  "addCharacter",
+  "adjustCharacterStars",
+  "adjustStars",
+  "deleteCharacter",
+  "updateCharacter"
+];
+
 /**
  * Parameters for POST requests to `/api/user/adjust/`.
  */
@@ -28,6 +94,17 @@ export interface StarSpendRequest {
   stars: number;
 }
 
+/**
+ * A single operation in a POST request to `/api/batch/`. See
+ * `exptracker/operations.py` for more information.
+ */
+export type BatchOperation =
+  | { op: "adjust"; stars: number; reason?: string }
+  | { op: "spend"; character: number; stars: number }
+  | { op: "set_stars"; character: number; stars: number; reason?: string }
+  | { op: "rename"; character: number; name: string }
+  | { op: "set_dead"; character: number; dead: boolean };
+
 /**
  * A character as returned by the REST API. This will be transformed into the
  * Character definition below.
@@ -84,6 +161,11 @@ export var store = new Vuex.Store({
     characters: <{ [id: number]: Character }>{},
     lastVersion: window.localStorage.getItem("last-version") || CURRENT_VERSION,
     logs: <LogEntry[]>[],
+    /**
+     * The highest log entry id we've received so far. Opening the logs will
+     * only fetch the entries added after this one.
+     */
+    logsHighWaterMark: <number>0,
     user: <UserInfo | null>null
   },
   getters: {
@@ -124,8 +206,24 @@ export var store = new Vuex.Store({
     updateCharacter(state, updatedCharacter: Character) {
       state.characters[updatedCharacter.id] = updatedCharacter;
     },
-    setLogs(state, logs: LogEntry[]) {
-      state.logs = logs;
+    // Imported entries can have older timestamps than the entries we already
+    // have, so the log needs to be sorted again. Entries we already have are
+    // skipped since log synchronization fetches overlapping ranges.
+    addLogs(state, logs: LogEntry[]) {
+      const knownIds = new Set(state.logs.map(log => log.id));
+      const newLogs = logs.filter(log => !knownIds.has(log.id));
+      state.logs = _.orderBy(
+        [...state.logs, ...newLogs],
+        [log => new Date(log.created_at).getTime(), "id"],
+        ["desc", "desc"]
+      );
+    },
+    resetLogs(state) {
+      state.logs = [];
+      state.logsHighWaterMark = 0;
+    },
+    setLogsHighWaterMark(state, id: number) {
+      state.logsHighWaterMark = Math.max(state.logsHighWaterMark, id);
     },
     // This mutation together with the `finishRequest` mutation are called
     // through axios' request interceptors so we can keep track of the number of
@@ -136,12 +234,27 @@ export var store = new Vuex.Store({
   },
   actions: {
     async adjustStars({ commit }, params: AdjustRequest) {
-      await axios.post("/api/user/adjust/", params);
+      await sendWrite("post", "/api/user/adjust/", params);
 
       commit("adjustStars", params.stars);
     },
+    // Apply multiple changes in a single request and transaction. The server
+    // returns the new state of everything that was modified.
+    async applyBatch({ commit, state }, operations: BatchOperation[]) {
+      const response = await sendWrite("post", "/api/batch/", { operations });
+
+      if (state.user !== null) {
+        commit(
+          "adjustStars",
+          response.data.unspent_stars - state.user.unspent_stars
+        );
+      }
+      for (const character of response.data.characters) {
+        commit("updateCharacter", character);
+      }
+    },
     async createCharacter({ commit }, character: Character) {
-      const response = await axios.post("/api/characters/", character);
+      const response = await sendWrite("post", "/api/characters/", character);
 
       // The server generates the new character's ID for us
       commit("addCharacter", response.data);
@@ -163,13 +276,26 @@ export var store = new Vuex.Store({
 
       commit("initUserInfo", response.data);
     },
-    async fetchLogs({ commit }) {
-      const response = await axios.get("/api/user/logs/");
+    async fetchLogs({ commit, state }) {
+      // Only entries that were added since the last time are fetched, see
+      // `LOG_SYNC_OVERLAP`. Entries we already have are not refreshed, so
+      // changes to them (such as `character` becoming null when the character
+      // gets deleted) only show up after `resetLogs`.
+      let sinceId = Math.max(state.logsHighWaterMark - LOG_SYNC_OVERLAP, 0);
+      let hasMore = true;
+      while (hasMore) {
+        const response = await axios.get("/api/user/logs/", {
+          params: { since_id: sinceId, page_size: 1000 }
+        });
 
-      commit("setLogs", response.data);
+        commit("addLogs", response.data.results);
+        commit("setLogsHighWaterMark", response.data.high_water_mark);
+        sinceId = response.data.high_water_mark;
+        hasMore = response.data.has_more;
+      }
     },
     async renameCharacter({ commit }, renamedCharacter: Character) {
-      await axios.patch(`/api/characters/${renamedCharacter.id}/`, {
+      await sendWrite("patch", `/api/characters/${renamedCharacter.id}/`, {
         name: renamedCharacter.name
       });
 
@@ -179,7 +305,7 @@ export var store = new Vuex.Store({
     // `exptracker/api/character.py` for more information
     async setCharacterStars({ commit, state }, updatedCharacter: Character) {
       const oldStars = state.characters[updatedCharacter.id].stars;
-      await axios.patch(`/api/characters/${updatedCharacter.id}/`, {
+      await sendWrite("patch", `/api/characters/${updatedCharacter.id}/`, {
         stars: updatedCharacter.stars,
         reason: updatedCharacter.reason
       });
@@ -190,21 +316,46 @@ export var store = new Vuex.Store({
       });
     },
     async setDeathStatus({ commit }, updatedCharacter: Character) {
-      await axios.patch(`/api/characters/${updatedCharacter.id}/`, {
+      await sendWrite("patch", `/api/characters/${updatedCharacter.id}/`, {
         dead: updatedCharacter.dead
       });
 
       commit("updateCharacter", updatedCharacter);
     },
     async setIronManStatus({ commit }, updatedCharacter: Character) {
-      await axios.patch(`/api/characters/${updatedCharacter.id}/`, {
+      await sendWrite("patch", `/api/characters/${updatedCharacter.id}/`, {
         iron_man: updatedCharacter.iron_man
       });
 
       commit("updateCharacter", updatedCharacter);
     },
+    // Apply changes made in the player's other open sessions as they happen.
+    // See `exptracker/events.py` for more information.
+    subscribeToEvents({ commit, dispatch }) {
+      const source = new EventSource(`/api/events/?client_id=${CLIENT_ID}`);
+
+      for (const mutation of LIVE_MUTATIONS) {
+        source.addEventListener(mutation, event =>
+          commit(mutation, JSON.parse((event as MessageEvent).data))
+        );
+      }
+
+      // The server will close the stream if we fall too far behind or if we
+      // missed events while reconnecting, in which case we'll simply reload
+      // everything. The log will be fetched again the next time it's opened.
+      source.addEventListener("resync", async () => {
+        source.close();
+        commit("resetLogs");
+        await Promise.all([
+          dispatch("fetchCharacters"),
+          dispatch("fetchUserInfo")
+        ]);
+
+        dispatch("subscribeToEvents");
+      });
+    },
     async spendStars({ commit }, params: StarSpendRequest) {
-      await axios.post(`/api/characters/${params.id}/spend/`, params);
+      await sendWrite("post", `/api/characters/${params.id}/spend/`, params);
 
       commit("adjustStars", -params.stars);
       commit("adjustCharacterStars", params);